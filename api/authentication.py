@@ -0,0 +1,126 @@
+"""
+JWT authentication that resolves users from an in-process cache.
+
+simplejwt's ``JWTAuthentication`` loads the ``User`` row on every request.
+``CachedJWTAuthentication`` keeps recently seen users (with their profile
+and role joined) for ``AUTH_USER_CACHE_TTL`` seconds, so the hot path of an
+authenticated request costs no queries.  The signal handlers in
+``api.signals`` drop entries when a user, profile or role changes; other
+processes pick changes up when their entries expire.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Bounded LRU of ``user id -> User`` with a TTL.
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000)
+        self.ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 60) if ttl is None else ttl
+        # str(user id) -> (user, expires_at); simplejwt puts ids in tokens as strings
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        A private copy of the cached user, or None on a miss.
+        """
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Requests may set attributes on request.user; don't share them
+        return copy.copy(user)
+
+    def store(self, user):
+        if self.ttl <= 0:
+            return
+        key = str(user.pk)
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def forget_role(self, role_id):
+        """
+        Drop every cached user whose profile has this role.
+        """
+        with self._lock:
+            for key in [
+                key for key, (user, _) in self._entries.items()
+                if getattr(getattr(user, 'profile', None), 'role_id', None) == role_id
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def load_user(user_id):
+    """
+    Fetch a user with profile and role joined, or None.
+    """
+    return (
+        get_user_model().objects
+        .select_related('profile__role')
+        .filter(**{api_settings.USER_ID_FIELD: user_id})
+        .first()
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` with users served from ``user_cache``.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            user = load_user(user_id)
+            if user is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.store(user)
+            user = copy.copy(user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
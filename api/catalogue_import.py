@@ -0,0 +1,227 @@
+"""
+Bulk import of Jewellery, RFID and RFID-jewellery maps from CSV or NDJSON.
+
+Rows are read one at a time from the uploaded stream, validated against
+the model fields in chunks, and upserted with one
+``bulk_create(update_conflicts=True)`` per chunk: on ``jewellery_id`` for
+jewellery, ``tag`` for RFIDs and (jewellery, rfid) for maps.  Map rows
+reference jewellery and tags by their business keys, which are resolved
+with one query per chunk.  Each chunk commits on its own, so re-running an
+interrupted import is safe.
+
+A key repeated within a chunk is saved from its last row; the earlier rows
+are reported as superseded.  A chunk the database refuses is reported as
+failed row by row and the import goes on with the next one.
+"""
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from .models import Jewellery, RFID, RFIDJewelleryMap
+from .tag_cache import tag_cache
+
+FORMATS = ('csv', 'ndjson')
+
+JEWELLERY_FIELDS = ['jewellery_id', 'design_number', 'collection_type', 'metal_type', 'category', 'sub_category', 'status']
+RFID_FIELDS = ['tag', 'status']
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def detect_format(name='', declared=None):
+    fmt = (declared or '').lower() or name.rsplit('.', 1)[-1].lower()
+    if fmt in ('json', 'jsonl'):
+        fmt = 'ndjson'
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unsupported format {fmt!r}; use csv or ndjson")
+    return fmt
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield ``(line, row, error)`` from a binary stream without reading it
+    all into memory.  ``row`` is a dict of strings, or None with ``error``.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {key.strip(): (value or '').strip() for key, value in row.items() if key}, None
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None, 'Invalid JSON'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, 'Expected a JSON object'
+            continue
+        yield line_no, {key: '' if value is None else str(value).strip() for key, value in row.items()}, None
+
+
+class CatalogueImporter:
+    """
+    Import one kind of catalogue row; call ``run(rows)`` with the output
+    of ``iter_rows``.
+    """
+    kinds = ('jewellery', 'rfid', 'map')
+
+    def __init__(self, kind, user=None, chunk_size=None, max_errors=None):
+        if kind not in self.kinds:
+            raise ImportFormatError(f"Unknown import kind {kind!r}; use {', '.join(self.kinds)}")
+        self.kind = kind
+        self.user = user
+        self.chunk_size = chunk_size or getattr(settings, 'IMPORT_CHUNK_SIZE', 2000)
+        self.max_errors = max_errors or getattr(settings, 'IMPORT_MAX_ERRORS', 1000)
+        self.rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.superseded = 0
+        self.superseded_rows = []
+
+    def run(self, rows, progress=None):
+        chunk = []
+        for line, row, error in rows:
+            self.rows += 1
+            if error:
+                self.reject(line, {'row': [error]})
+                continue
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+                if progress:
+                    progress(self)
+        if chunk:
+            self.import_chunk(chunk)
+            if progress:
+                progress(self)
+        return self.report()
+
+    def reject(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def supersede(self, line, by):
+        self.superseded += 1
+        if len(self.superseded_rows) < self.max_errors:
+            self.superseded_rows.append({'line': line, 'by': by})
+
+    def report(self):
+        return {
+            'kind': self.kind,
+            'rows': self.rows,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'superseded': self.superseded,
+            'superseded_rows': self.superseded_rows,
+        }
+
+    def import_chunk(self, chunk):
+        build = getattr(self, f'build_{self.kind}')
+        objects = {}
+        for line, key, obj in build(chunk):
+            try:
+                obj.clean_fields(exclude=['added_by', 'jewellery', 'rfid'])
+            except ValidationError as exc:
+                self.reject(line, exc.message_dict)
+                continue
+            # A key repeated within the chunk keeps its last row; one
+            # INSERT .. ON CONFLICT cannot touch the same row twice
+            if key in objects:
+                self.supersede(objects[key][0], line)
+            objects[key] = (line, obj)
+        if not objects:
+            return
+
+        saved = [obj for _, obj in objects.values()]
+        try:
+            with transaction.atomic():
+                getattr(self, f'save_{self.kind}')(saved)
+        except DatabaseError as exc:
+            for line, _ in objects.values():
+                self.reject(line, {'row': [f'Not saved: {exc}']})
+            return
+        self.imported += len(saved)
+
+    def build_jewellery(self, chunk):
+        for line, row in chunk:
+            values = {field: row.get(field, '') for field in JEWELLERY_FIELDS}
+            values['status'] = values['status'] or 'active'
+            yield line, values['jewellery_id'], Jewellery(added_by=self.user, **values)
+
+    def save_jewellery(self, objects):
+        Jewellery.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=['jewellery_id'],
+            update_fields=JEWELLERY_FIELDS[1:] + ['updated_at'],
+        )
+
+    def build_rfid(self, chunk):
+        for line, row in chunk:
+            tag = row.get('tag', '')
+            yield line, tag, RFID(tag=tag, status=row.get('status') or 'active', added_by=self.user)
+
+    def save_rfid(self, objects):
+        RFID.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=['tag'],
+            update_fields=['status', 'updated_at'],
+        )
+        # bulk_create sends no post_save; keep this process's tag cache warm
+        for rfid in objects:
+            if rfid.pk is not None:
+                tag_cache.store(rfid.tag, rfid.pk)
+
+    def build_map(self, chunk):
+        jewellery_ids = dict(
+            Jewellery.objects
+            .filter(jewellery_id__in={row.get('jewellery_id', '') for _, row in chunk})
+            .values_list('jewellery_id', 'pk')
+        )
+        rfid_ids = dict(
+            RFID.objects
+            .filter(tag__in={row.get('tag', '') for _, row in chunk})
+            .values_list('tag', 'pk')
+        )
+        for line, row in chunk:
+            jewellery_pk = jewellery_ids.get(row.get('jewellery_id', ''))
+            rfid_pk = rfid_ids.get(row.get('tag', ''))
+            errors = {}
+            if jewellery_pk is None:
+                errors['jewellery_id'] = ['Unknown jewellery_id']
+            if rfid_pk is None:
+                errors['tag'] = ['Unknown tag']
+            if errors:
+                self.reject(line, errors)
+                continue
+            yield line, (jewellery_pk, rfid_pk), RFIDJewelleryMap(
+                jewellery_id=jewellery_pk,
+                rfid_id=rfid_pk,
+                status=row.get('status') or 'active',
+                added_by=self.user,
+            )
+
+    def save_map(self, objects):
+        RFIDJewelleryMap.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=['jewellery', 'rfid'],
+            update_fields=['status', 'updated_at'],
+        )
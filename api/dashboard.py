@@ -0,0 +1,151 @@
+"""
+Dashboard widgets.
+
+Each widget is a function returning the JSON-ready data of one dashboard
+card.  The per-widget endpoints and ``/api/dashboard/summary/`` both go
+through ``WIDGETS``, so a card renders the same either way.
+
+Widget data is cached in Django's cache framework for
+``DASHBOARD_CACHE_TTL`` seconds (``WIDGET_TTLS`` overrides it per widget),
+and dropped as soon as a row of one of its ``WIDGET_MODELS`` is saved or
+deleted (see api/signals.py).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from .models import (
+    ActiveAuthor, Designation, NewUser, Project, ProjectTask,
+    SalesDistribution, TrafficSource, UserActivity,
+)
+from .serializers import (
+    ActiveAuthorSerializer, DesignationSerializer, NewUserSerializer,
+    ProjectSerializer, SalesDistributionSerializer, TrafficSourceSerializer,
+    UserActivitySerializer,
+)
+
+
+def total_users():
+    return {'total': User.objects.count(), 'growth': 12.5}
+
+
+def traffic_sources():
+    return TrafficSourceSerializer(TrafficSource.objects.all(), many=True).data
+
+
+def new_users():
+    return NewUserSerializer(NewUser.objects.order_by('-time_added')[:4], many=True).data
+
+
+def sales_distribution():
+    return SalesDistributionSerializer(SalesDistribution.objects.all(), many=True).data
+
+
+def project_progress():
+    project = Project.objects.prefetch_related('tasks').order_by('pk').first()
+    if not project:
+        return {}
+    return ProjectSerializer(project).data
+
+
+def active_authors():
+    return ActiveAuthorSerializer(ActiveAuthor.objects.all(), many=True).data
+
+
+def new_designations():
+    return DesignationSerializer(Designation.objects.order_by('-date')[:4], many=True).data
+
+
+def user_activity():
+    return UserActivitySerializer(UserActivity.objects.all(), many=True).data
+
+
+WIDGETS = {
+    'total_users': total_users,
+    'traffic_sources': traffic_sources,
+    'new_users': new_users,
+    'sales_distribution': sales_distribution,
+    'project_progress': project_progress,
+    'active_authors': active_authors,
+    'new_designations': new_designations,
+    'user_activity': user_activity,
+}
+
+
+# Models each widget reads; a change to any of them invalidates the widget
+WIDGET_MODELS = {
+    'total_users': [User],
+    'traffic_sources': [TrafficSource],
+    'new_users': [NewUser],
+    'sales_distribution': [SalesDistribution],
+    'project_progress': [Project, ProjectTask],
+    'active_authors': [ActiveAuthor],
+    'new_designations': [Designation],
+    'user_activity': [UserActivity],
+}
+
+# Seconds; widgets not listed use DASHBOARD_CACHE_TTL
+WIDGET_TTLS = {
+    'total_users': 60,
+}
+
+CACHE_PREFIX = 'dashboard:widget:'
+HITS_KEY = 'dashboard:stats:hits'
+MISSES_KEY = 'dashboard:stats:misses'
+
+
+def widget_ttl(name):
+    return WIDGET_TTLS.get(name, getattr(settings, 'DASHBOARD_CACHE_TTL', 300))
+
+
+def get_widget(name):
+    """
+    Cached data of one widget, computed on a miss.
+    """
+    key = CACHE_PREFIX + name
+    data = cache.get(key)
+    if data is not None:
+        _count(HITS_KEY)
+        return data
+    _count(MISSES_KEY)
+    data = WIDGETS[name]()
+    cache.set(key, data, widget_ttl(name))
+    return data
+
+
+def build_summary(names=None):
+    """
+    Data of the requested widgets (all of them when ``names`` is empty),
+    keyed by widget name.
+    """
+    names = names or list(WIDGETS)
+    return {name: get_widget(name) for name in names}
+
+
+def widgets_for_model(model):
+    return [name for name, models in WIDGET_MODELS.items() if model in models]
+
+
+def invalidate_widgets(names):
+    cache.delete_many([CACHE_PREFIX + name for name in names])
+
+
+def _count(key):
+    # add() is a no-op when the counter exists; incr() is atomic on
+    # shared backends such as Redis
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # evicted between add() and incr()
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 3) if lookups else None,
+    }
@@ -0,0 +1,109 @@
+"""
+Read-burst deduplication for RFID scans.
+
+A fixed reader reports a tag many times a second while it sits in the
+field.  Instead of storing every read, repeats of the same (tag, reader)
+within the window that starts at the first read are merged into that read's
+row: its ``hit_count`` is incremented and ``last_seen`` moved forward.  The
+window is not extended by repeats, so a tag that stays in the field gets a
+new row every ``window`` seconds and no row collects reads for longer.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def scan_reader(scan):
+    """
+    Identify the reader a scan came from: the EMQX clientid when known,
+    otherwise the topic it was published on.
+    """
+    return scan.reader_id or scan.topic
+
+
+class ScanDeduplicator:
+    """
+    Tracks the open scan row per (tag, reader) key.
+
+    ``collapse()`` folds repeats into the tracked rows and returns the scans
+    that still need inserting.  Rows that received extra hits after being
+    saved are handed out by ``pop_dirty()`` for a batched update.
+    """
+
+    def __init__(self, window=None, max_keys=None):
+        if window is None:
+            window = getattr(settings, 'RFID_SCAN_DEDUP_WINDOW', 2.0)
+        self.window = window
+        self.max_keys = max_keys or getattr(settings, 'RFID_SCAN_DEDUP_MAX_KEYS', 100000)
+        self._open = OrderedDict()  # (tag, reader) -> (scan, monotonic time it opened)
+        self._dirty = {}  # id(scan) -> scan
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def collapse(self, scans):
+        """
+        Merge repeats into open rows; returns the scans that are new.
+        """
+        if not self.enabled:
+            return list(scans)
+
+        now = time.monotonic()
+        fresh = []
+        with self._lock:
+            self._expire(now)
+            for scan in scans:
+                key = (scan.rfid_tag, scan_reader(scan))
+                entry = self._open.get(key)
+                if entry is not None:
+                    target = entry[0]
+                    target.hit_count += scan.hit_count
+                    target.last_seen = max(target.last_seen, scan.last_seen)
+                    self._dirty[id(target)] = target
+                else:
+                    self._open[key] = (scan, now)
+                    fresh.append(scan)
+            while len(self._open) > self.max_keys:
+                self._open.popitem(last=False)
+        return fresh
+
+    def pop_dirty(self):
+        """
+        Saved rows whose hit counts changed since they were written.
+        """
+        with self._lock:
+            ready = [scan for scan in self._dirty.values() if scan.pk is not None]
+            for scan in ready:
+                del self._dirty[id(scan)]
+        return ready
+
+    def restore_dirty(self, scans):
+        """
+        Put back rows whose update failed so it is retried with the next write.
+        """
+        with self._lock:
+            for scan in scans:
+                self._dirty[id(scan)] = scan
+
+    def discard(self, scans):
+        """
+        Stop tracking scans that were never stored (e.g. a failed insert).
+        """
+        doomed = {id(scan) for scan in scans}
+        with self._lock:
+            for key in [key for key, (scan, _) in self._open.items() if id(scan) in doomed]:
+                del self._open[key]
+            for scan_id in doomed:
+                self._dirty.pop(scan_id, None)
+
+    def _expire(self, now):
+        # Caller holds the lock.  Entries are kept in the order they opened.
+        while self._open:
+            key, (scan, opened) = next(iter(self._open.items()))
+            if now - opened <= self.window:
+                break
+            del self._open[key]
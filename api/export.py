@@ -0,0 +1,85 @@
+"""
+Streaming export of RFIDScan history as CSV or NDJSON.
+
+Rows come from ``QuerySet.iterator(chunk_size=...)`` (a server-side cursor
+on PostgreSQL) and are encoded and optionally gzipped piece by piece, so
+memory use is the same for a thousand rows or fifty million.
+"""
+import csv
+import io
+import json
+import zlib
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+EXPORT_FIELDS = [
+    'id', 'rfid_tag', 'rfid_id', 'reader_id', 'topic', 'qos', 'hit_count',
+    'first_seen', 'last_seen', 'broker_ts', 'created_at',
+]
+FORMATS = ('csv', 'ndjson')
+
+
+def export_chunk_size():
+    return getattr(settings, 'RFID_SCAN_EXPORT_CHUNK_SIZE', 2000)
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def export_rows(queryset, fmt, chunk_size=None):
+    """
+    Yield the encoded export in pieces of about ``chunk_size`` rows.
+    """
+    chunk_size = chunk_size or export_chunk_size()
+    rows = queryset.order_by('created_at', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+
+    pending = 0
+    for row in rows:
+        values = [_value(value) for value in row]
+        if writer:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, values))))
+            buffer.write('\n')
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_stream(chunks):
+    """
+    Gzip a stream of byte chunks on the fly.
+    """
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def iterate_async(iterable):
+    """
+    Serve a sync iterator to an async response without buffering it;
+    each step runs in the same worker thread so the cursor stays valid.
+    """
+    iterator = iter(iterable)
+    step = sync_to_async(partial(next, iterator, None), thread_sensitive=True)
+    while True:
+        chunk = await step()
+        if chunk is None:
+            break
+        yield chunk
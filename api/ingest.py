@@ -0,0 +1,546 @@
+"""
+Helpers shared by the MQTT ingestion paths (webhook views and the
+mqtt_subscriber management command).
+"""
+import asyncio
+import queue
+import random
+import re
+import threading
+import time
+import weakref
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, InterfaceError, OperationalError, connection, transaction
+
+from .dedup import ScanDeduplicator, scan_reader
+from .models import RFIDScan
+from .tag_cache import tag_cache
+
+
+def keep_raw_payload(malformed=False):
+    """
+    Decide whether to store the raw envelope, per RFID_SCAN_PAYLOAD_MODE:
+    'all', 'none', 'errors' (malformed messages only) or 'sample'
+    (malformed messages plus RFID_SCAN_PAYLOAD_SAMPLE_RATE of the rest).
+    """
+    mode = getattr(settings, 'RFID_SCAN_PAYLOAD_MODE', 'errors')
+    if mode == 'all':
+        return True
+    if mode == 'none':
+        return False
+    if malformed:
+        return True
+    if mode == 'sample':
+        return random.random() < getattr(settings, 'RFID_SCAN_PAYLOAD_SAMPLE_RATE', 0.01)
+    return False
+
+
+def parse_broker_timestamp(value):
+    """
+    EMQX timestamps are milliseconds since the epoch; returns None if absent
+    and raises ValueError if present but unusable.
+    """
+    if value is None or value == '':
+        return None
+    return datetime.fromtimestamp(int(value) / 1000, tz=dt_timezone.utc)
+
+
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x1f\x7f]')
+
+
+class InvalidScan(ValueError):
+    """
+    A message that cannot be stored as a scan.
+    """
+
+
+def clean_tag(value):
+    """
+    The tag string of a message payload.  Raises InvalidScan for empty or
+    non-scalar payloads and for tags that do not fit ``RFIDScan.rfid_tag``
+    or contain control characters (PostgreSQL refuses NUL in text).
+    """
+    if value is None or value == '':
+        raise InvalidScan('No payload')
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise InvalidScan('Payload must be a tag string')
+    tag = str(value)
+    max_length = RFIDScan._meta.get_field('rfid_tag').max_length
+    if len(tag) > max_length:
+        raise InvalidScan(f'Tag longer than {max_length} characters')
+    if CONTROL_CHARACTERS.search(tag):
+        raise InvalidScan('Tag contains control characters')
+    return tag
+
+
+def build_scan(tag, topic='', qos=None, reader_id='', broker_ts=None, raw=None, malformed=False):
+    """
+    Build an unsaved RFIDScan with the envelope fields as columns.  ``raw``
+    is stored only when keep_raw_payload() says so; it may be a callable so
+    the dict is only built when needed.  Raises InvalidScan for an unusable
+    tag (see clean_tag).
+    """
+    tag = clean_tag(tag)
+    payload = None
+    if keep_raw_payload(malformed):
+        payload = raw() if callable(raw) else raw
+    return RFIDScan(
+        rfid_tag=tag,
+        topic=topic or '',
+        qos=qos,
+        reader_id=reader_id or '',
+        broker_ts=broker_ts,
+        payload=payload,
+    )
+
+
+def scan_from_envelope(data):
+    """
+    Build a scan from an EMQX message envelope, e.g.
+    {"topic": "/transaction", "payload": "TAG-12345", "qos": 1,
+     "clientid": "reader-7", "timestamp": 1760000000000, ...}
+    Raises InvalidScan if the payload is not a usable tag.
+    """
+    payload = data.get('payload')
+    malformed = not isinstance(payload, str) or not data.get('clientid')
+    try:
+        broker_ts = parse_broker_timestamp(data.get('timestamp') or data.get('publish_received_at'))
+    except (TypeError, ValueError, OverflowError, OSError):
+        broker_ts = None
+        malformed = True
+    qos = data.get('qos')
+    if not isinstance(qos, int) or isinstance(qos, bool):
+        qos = None
+    return build_scan(
+        payload,
+        topic=str(data.get('topic') or '')[:255],
+        qos=qos,
+        reader_id=str(data.get('clientid') or '')[:100],
+        broker_ts=broker_ts,
+        raw=data,
+        malformed=malformed,
+    )
+
+
+class IngestStats:
+    """
+    Running counters for a scan writer, used for throughput reporting.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.received = 0
+        self.written = 0
+        self.merged = 0
+        self.failed = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.batches = 0
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+
+class ScanBatchWriter(threading.Thread):
+    """
+    Write-behind buffer for RFID scans.
+
+    Producers (the paho network loop) call ``submit()`` with unsaved
+    ``RFIDScan`` instances.  A background thread collects them and writes
+    them with one ``bulk_create`` as soon as ``batch_size`` scans are
+    waiting or ``flush_interval`` seconds have passed since the oldest one
+    arrived.  The queue is bounded by ``queue_size``; when it is full
+    ``submit()`` blocks, which pushes back on the broker instead of growing
+    memory without limit.  Read bursts are merged by ``dedup`` before
+    writing.
+
+    A batch the database refuses for any other reason is retried in halves
+    down to single rows, so one bad row only costs itself; rejected rows
+    are reported.
+
+    With a ``spool``, batches that can't be written because the database is
+    unreachable are appended to it, and so is everything after them until
+    the spool has been replayed, which is retried every ``retry_interval``
+    seconds.  Scans therefore survive outages and keep their order.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size=500, flush_interval=1.0, queue_size=10000,
+                 stats_interval=10.0, report=None, on_flush=None, dedup=None,
+                 spool=None, retry_interval=5.0):
+        super().__init__(name='scan-writer', daemon=True)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.stats_interval = stats_interval
+        self.stats = IngestStats()
+        self.report = report or (lambda message: None)
+        self.on_flush = on_flush
+        self.dedup = dedup if dedup is not None else ScanDeduplicator()
+        self.spool = spool
+        self.retry_interval = retry_interval
+        # Replay anything left over from a previous run straight away
+        self._next_retry = time.monotonic()
+
+    def submit(self, scan):
+        self.stats.received += 1
+        self.queue.put(scan)
+
+    def stop(self, timeout=None):
+        """
+        Flush everything still queued and wait for the thread to exit.
+        """
+        self.queue.put(self._STOP)
+        self.join(timeout)
+
+    def run(self):
+        batch = []
+        deadline = None
+        next_report = time.monotonic() + self.stats_interval if self.stats_interval else None
+        try:
+            while True:
+                now = time.monotonic()
+                timeout = None
+                if deadline is not None:
+                    timeout = max(0.0, deadline - now)
+                if next_report is not None:
+                    until_report = max(0.0, next_report - now)
+                    timeout = until_report if timeout is None else min(timeout, until_report)
+                if self.spool is not None:
+                    until_retry = max(0.0, self._next_retry - now)
+                    timeout = until_retry if timeout is None else min(timeout, until_retry)
+
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._STOP:
+                    break
+                if item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                now = time.monotonic()
+                if batch and (len(batch) >= self.batch_size or now >= deadline):
+                    self.flush(batch)
+                    batch = []
+                    deadline = None
+                if self.spool is not None and now >= self._next_retry:
+                    self.replay_spool()
+                if next_report is not None and now >= next_report:
+                    self.report_stats()
+                    next_report = now + self.stats_interval
+
+            self.flush(batch)
+            self.report_stats()
+        finally:
+            # The writer owns its own DB connection; don't leak it on exit.
+            connection.close()
+
+    def flush(self, batch):
+        if not batch:
+            return
+        fresh = self.dedup.collapse(batch)
+        if self.spool is not None and self.spool.pending():
+            # Keep arrival order: newer scans wait behind the spooled ones
+            self.dedup.discard(fresh)
+            self.spool_scans(fresh)
+        else:
+            try:
+                save_scans(fresh, batch_size=self.batch_size, dedup=self.dedup)
+            except (OperationalError, InterfaceError) as e:
+                self.database_unavailable(fresh, e)
+            except Exception as e:
+                # Most likely a row the database refuses; don't let it take
+                # the rest of the batch down with it
+                self.report(f"⚠️ Failed to write {len(fresh)} scans, retrying in parts: {e}")
+                self.save_in_parts(fresh)
+            else:
+                self.stats.written += len(fresh)
+                self.stats.batches += 1
+            self.stats.merged += len(batch) - len(fresh)
+        if self.on_flush is not None:
+            self.on_flush(self.stats)
+
+    def database_unavailable(self, scans, error):
+        connection.close()
+        if self.spool is None:
+            self.stats.failed += len(scans)
+            self.report(f"⚠️ Failed to write {len(scans)} scans: {error}")
+        else:
+            self.report(f"⚠️ Database unavailable, spooling scans: {error}")
+            self.spool_scans(scans)
+            self._next_retry = time.monotonic() + self.retry_interval
+
+    def save_in_parts(self, scans):
+        """
+        Write scans whose batch insert failed, rejecting only the rows the
+        database refuses (see the module-level save_in_parts).
+        """
+        rejected, unsaved, error = save_in_parts(scans, batch_size=self.batch_size)
+        self.stats.written += len(scans) - len(rejected) - len(unsaved)
+        self.stats.batches += 1
+        for scan, reason in rejected:
+            self.reject(scan, reason)
+        if unsaved:
+            self.database_unavailable(unsaved, error)
+
+    def reject(self, scan, error):
+        self.stats.failed += 1
+        self.report(
+            f"🚫 Rejected scan tag={str(scan.rfid_tag)[:120]!r} reader={scan.reader_id!r} "
+            f"topic={scan.topic!r}: {error}"
+        )
+
+    def spool_scans(self, scans):
+        try:
+            self.spool.append(scans)
+        except OSError as e:
+            self.stats.failed += len(scans)
+            self.report(f"🔥 Could not spool {len(scans)} scans: {e}")
+        else:
+            self.stats.spooled += len(scans)
+
+    def replay_spool(self, max_batches=20):
+        """
+        Replay part of the spool; a few batches per call so the queue keeps
+        draining while a large backlog is written.
+        """
+        self._next_retry = time.monotonic() + self.retry_interval
+        if not self.spool.pending():
+            return
+        try:
+            replayed, drained = self.spool.replay(
+                lambda scans: save_spooled(self.spool, scans, batch_size=self.batch_size, reject=self.reject),
+                batch_size=self.batch_size,
+                max_batches=max_batches,
+            )
+        except (OperationalError, InterfaceError) as e:
+            connection.close()
+            self.report(f"⏳ Database still unavailable: {e}")
+            return
+        except Exception as e:
+            # Keep the writer alive; the replay is retried after the interval
+            self.report(f"🔥 Spool replay failed: {e}")
+            return
+        self.stats.replayed += replayed
+        self.stats.written += replayed
+        if drained:
+            self.report(f"✅ Spool replayed ({self.stats.replayed} scans so far)")
+        else:
+            # More to do; come back as soon as the queue allows
+            self._next_retry = time.monotonic()
+
+    def report_stats(self):
+        stats = self.stats
+        self.report(
+            f"📊 received={stats.received} written={stats.written} merged={stats.merged} failed={stats.failed} "
+            f"spooled={stats.spooled} batches={stats.batches} queued={self.queue.qsize()} rate={stats.rate:.1f}/s"
+        )
+
+
+class AsyncScanBatcher:
+    """
+    Batches scans from concurrent async webhook requests.
+
+    Each ``submit()`` waits until the batch holding its scan has been
+    committed, so a request is only acknowledged once its row is stored,
+    but thousands of in-flight requests share a handful of ``bulk_create``
+    calls instead of each paying for its own insert.  A row the database
+    refuses fails only the request it came from.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or getattr(settings, 'MQTT_ASYNC_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'MQTT_ASYNC_FLUSH_INTERVAL', 0.05)
+        self._pending = []  # (scan, future)
+        self._timer = None
+
+    async def submit(self, scan):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((scan, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self._flush)
+        await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._write(batch))
+
+    async def _write(self, batch):
+        try:
+            rejected = await sync_to_async(self._save)([scan for scan, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # A scan merged into a refused row shares its fate
+        refused = {(scan.rfid_tag, scan_reader(scan)): error for scan, error in rejected}
+        for scan, future in batch:
+            if future.done():
+                continue
+            error = refused.get((scan.rfid_tag, scan_reader(scan)))
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def _save(scans):
+        """
+        Store a batch; returns the rows the database refused, so only their
+        requests fail.  Raises if the database is unreachable.
+        """
+        fresh = scan_dedup.collapse(scans)
+        try:
+            save_scans(fresh, dedup=scan_dedup)
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception:
+            rejected, unsaved, error = save_in_parts(fresh)
+            if unsaved:
+                raise error
+            return rejected
+        return []
+
+
+_async_batchers = weakref.WeakKeyDictionary()
+
+
+def get_async_batcher():
+    """
+    Return the batcher bound to the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    batcher = _async_batchers.get(loop)
+    if batcher is None:
+        batcher = _async_batchers[loop] = AsyncScanBatcher()
+    return batcher
+
+
+def write_scans(scans, batch_size=None, dedup=None):
+    """
+    Link unsaved scans to their RFID rows and insert them in one go.
+
+    With a deduplicator, repeats are first merged into rows that are still
+    open and the merged rows' counters are updated in the same pass.
+    Returns the scans that were inserted as new rows.
+    """
+    if dedup is not None:
+        scans = dedup.collapse(scans)
+    save_scans(scans, batch_size=batch_size, dedup=dedup)
+    return scans
+
+
+def save_scans(scans, batch_size=None, dedup=None):
+    """
+    Insert scans that are already deduplicated and apply the deduplicator's
+    pending merges, all in one transaction.
+
+    The RFID pks come from the tag cache, which only hears about deletions
+    made in this process.  If the insert trips a foreign key, the batch's
+    tags are dropped from the cache and the insert is retried once with
+    freshly resolved pks (``None`` for tags that are gone).
+    """
+    merged = dedup.pop_dirty() if dedup is not None else []
+    try:
+        try:
+            _insert_scans(scans, merged, batch_size)
+        except IntegrityError:
+            if not scans:
+                raise
+            tag_cache.discard(scan.rfid_tag for scan in scans)
+            for scan in scans:
+                # A deferred constraint fails at commit, after pks were set
+                scan.pk = None
+                scan._state.adding = True
+            _insert_scans(scans, merged, batch_size)
+    except Exception:
+        if dedup is not None:
+            dedup.discard(scans)
+            dedup.restore_dirty(merged)
+        raise
+
+
+def _insert_scans(scans, merged, batch_size):
+    with transaction.atomic():
+        if scans:
+            rfid_ids = tag_cache.resolve_many(scan.rfid_tag for scan in scans)
+            for scan in scans:
+                scan.rfid_id = rfid_ids[scan.rfid_tag]
+            RFIDScan.objects.bulk_create(scans, batch_size=batch_size)
+        if merged:
+            RFIDScan.objects.bulk_update(merged, ['hit_count', 'last_seen'], batch_size=batch_size)
+
+
+def save_in_parts(scans, batch_size=None):
+    """
+    Write scans whose batch insert failed by halving the batch until the
+    rows the database refuses are isolated.
+
+    Returns ``(rejected, unsaved, error)``: ``(scan, exception)`` for every
+    refused row, and, if the database became unreachable part way, the rows
+    not written yet (in order) with that error.
+    """
+    rejected = []
+    parts = [list(scans)]  # stack, next part last
+    while parts:
+        part = parts.pop()
+        try:
+            save_scans(part, batch_size=batch_size)
+        except (OperationalError, InterfaceError) as e:
+            connection.close()
+            return rejected, part + [scan for rest in reversed(parts) for scan in rest], e
+        except Exception as e:
+            if len(part) > 1:
+                middle = len(part) // 2
+                parts += [part[middle:], part[:middle]]
+            else:
+                rejected.append((part[0], e))
+    return rejected, [], None
+
+
+def save_spooled(spool, scans, batch_size=None, reject=None):
+    """
+    Write a batch read back from ``spool``; returns how many rows were stored.
+
+    Rows the database refuses are moved to the spool's quarantine file (and
+    passed to ``reject(scan, error)``) so they can't block the replay.
+    Raises if the database is unreachable; the batch is then replayed from
+    its start, so rows isolated before the outage may be written twice.
+    """
+    try:
+        save_scans(scans, batch_size=batch_size)
+        return len(scans)
+    except (OperationalError, InterfaceError):
+        raise
+    except Exception:
+        rejected, unsaved, error = save_in_parts(scans, batch_size=batch_size)
+    if rejected:
+        spool.quarantine([scan for scan, _ in rejected])
+        if reject is not None:
+            for scan, reason in rejected:
+                reject(scan, reason)
+    if unsaved:
+        raise error
+    return len(scans) - len(rejected)
+
+
+# Deduplicator shared by the webhook views of this process
+scan_dedup = ScanDeduplicator()
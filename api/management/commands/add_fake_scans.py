@@ -19,10 +19,16 @@ class Command(BaseCommand):
                 "qos": 1,
                 "clientid": f"publisher-{random.randint(1000,9999)}"
             }
+            scanned_at = base_time - timedelta(minutes=i*5)
             RFIDScan.objects.create(
                 rfid_tag=tag,
                 rfid=None,
+                topic=payload["topic"],
+                qos=payload["qos"],
+                reader_id=payload["clientid"],
                 payload=payload,
-                created_at=base_time - timedelta(minutes=i*5)
+                first_seen=scanned_at,
+                last_seen=scanned_at,
+                created_at=scanned_at
             )
         self.stdout.write(self.style.SUCCESS('Added 10 fake scans'))
\ No newline at end of file
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max
+from api.ingest import InvalidScan, scan_from_envelope
+from api.models import RFIDScan
+
+
+class Command(BaseCommand):
+    help = ('Fill first_seen/last_seen of existing RFID scans from created_at and '
+            'topic/qos/reader_id/broker_ts from their stored payload, in chunks')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows read and updated per transaction')
+        parser.add_argument('--start-after', type=int, default=0,
+                            help='Resume after this scan id')
+        parser.add_argument('--drop-payload', action='store_true',
+                            help='Also clear the raw payload unless RFID_SCAN_PAYLOAD_MODE says to keep it')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        drop_payload = options['drop_payload']
+        fields = ['topic', 'qos', 'reader_id', 'broker_ts']
+        if drop_payload:
+            fields.append('payload')
+
+        self.backfill_seen(options['start_after'], chunk_size)
+
+        last_pk = options['start_after']
+        total = 0
+        while True:
+            rows = list(
+                RFIDScan.objects
+                .filter(pk__gt=last_pk, payload__isnull=False)
+                .order_by('pk')
+                .only('pk', 'payload', *fields)[:chunk_size]
+            )
+            if not rows:
+                break
+
+            for scan in rows:
+                data = scan.payload
+                if not isinstance(data, dict) or not data.get('payload'):
+                    continue
+                try:
+                    parsed = scan_from_envelope(data)
+                except InvalidScan:
+                    continue
+                scan.topic = parsed.topic
+                scan.qos = parsed.qos
+                scan.reader_id = parsed.reader_id
+                scan.broker_ts = parsed.broker_ts
+                if drop_payload:
+                    scan.payload = parsed.payload
+
+            with transaction.atomic():
+                RFIDScan.objects.bulk_update(rows, fields)
+            last_pk = rows[-1].pk
+            total += len(rows)
+            self.stdout.write(f"✅ Backfilled {total} scans (last id {last_pk})")
+
+        self.stdout.write(self.style.SUCCESS(f'🎉 Backfill complete: {total} scans updated'))
+
+    def backfill_seen(self, last_pk, chunk_size):
+        """
+        Copy created_at into first_seen/last_seen of rows stored before read
+        merging existed, one id range per statement.
+        """
+        max_pk = RFIDScan.objects.aggregate(last=Max('pk'))['last'] or 0
+        total = 0
+        while last_pk < max_pk:
+            upper = last_pk + chunk_size
+            updated = (
+                RFIDScan.objects
+                .filter(pk__gt=last_pk, pk__lte=upper, first_seen__isnull=True)
+                .update(first_seen=F('created_at'), last_seen=F('created_at'))
+            )
+            last_pk = upper
+            if updated:
+                total += updated
+                self.stdout.write(f"✅ Filled first/last seen of {total} scans (up to id {min(upper, max_pk)})")
+        self.stdout.write(self.style.SUCCESS(f'🎉 First/last seen complete: {total} scans updated'))
@@ -0,0 +1,60 @@
+import sys
+from datetime import timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from api.export import FORMATS, export_chunk_size, export_rows, gzip_stream
+from api.models import RFIDScan
+
+
+class Command(BaseCommand):
+    help = 'Stream RFID scan history to a CSV or NDJSON file through a server-side cursor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-',
+                            help="File to write, or '-' for stdout")
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--tag', help='Only this tag')
+        parser.add_argument('--reader', help='Only this reader (EMQX clientid)')
+        parser.add_argument('--since', help='ISO 8601 start of the created_at range (inclusive)')
+        parser.add_argument('--until', help='ISO 8601 end of the created_at range (exclusive)')
+        parser.add_argument('--chunk-size', type=int, default=export_chunk_size(),
+                            help='Rows fetched from the cursor at a time')
+
+    def handle(self, *args, **options):
+        scans = RFIDScan.objects.all()
+        if options['tag']:
+            scans = scans.filter(rfid_tag=options['tag'])
+        if options['reader']:
+            scans = scans.filter(reader_id=options['reader'])
+        if options['since']:
+            scans = scans.filter(created_at__gte=self.parse_moment(options['since']))
+        if options['until']:
+            scans = scans.filter(created_at__lt=self.parse_moment(options['until']))
+
+        chunks = export_rows(scans, options['format'], options['chunk_size'])
+        if options['gzip']:
+            chunks = gzip_stream(chunks)
+
+        output = options['output']
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            written = 0
+            for chunk in chunks:
+                stream.write(chunk)
+                written += len(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(f"🎉 Exported scans to {output} ({written} bytes)"))
+
+    def parse_moment(self, value):
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f"Not an ISO 8601 datetime: {value!r}")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, dt_timezone.utc)
+        return moment
@@ -0,0 +1,52 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api.catalogue_import import CatalogueImporter, ImportFormatError, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk upsert jewellery, RFID tags or mappings from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=CatalogueImporter.kinds)
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int,
+                            help='Rows validated and upserted per transaction (IMPORT_CHUNK_SIZE)')
+        parser.add_argument('--user', help='Username recorded as added_by on new rows')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"Unknown user {options['user']!r}")
+
+        try:
+            fmt = detect_format('' if path == '-' else path, options['format'])
+            importer = CatalogueImporter(options['kind'], user=user, chunk_size=options['chunk_size'])
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        def progress(importer):
+            self.stdout.write(f"✅ {importer.imported} imported, {importer.failed} failed ({importer.rows} rows read)")
+
+        if path == '-':
+            report = importer.run(iter_rows(sys.stdin.buffer, fmt), progress)
+        else:
+            with open(path, 'rb') as stream:
+                report = importer.run(iter_rows(stream, fmt), progress)
+
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Line {error['line']}: {error['errors']}"))
+        if report['errors_truncated']:
+            self.stdout.write(self.style.WARNING(f"... {report['failed'] - len(report['errors'])} more errors not shown"))
+        for row in report['superseded_rows']:
+            self.stdout.write(self.style.WARNING(f"⚠️ Line {row['line']}: superseded by line {row['by']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"🎉 Import complete: {report['imported']} {report['kind']} rows imported, {report['failed']} failed, "
+            f"{report['superseded']} superseded"
+        ))
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from api.models import RFIDScan
+from api.partitions import (
+    DEFAULT_PARTITION, drop_partition, ensure_partitions, is_partitioned,
+    list_partitions, next_partition_start, partition_interval, retention_cutoff,
+    summarize_scans,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming RFIDScan partitions and roll up / drop the ones past retention'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=getattr(settings, 'RFID_SCAN_PARTITIONS_AHEAD', 3),
+                            help='Number of future partitions to keep created')
+        parser.add_argument('--retention-days', type=int, default=getattr(settings, 'RFID_SCAN_RETENTION_DAYS', 0),
+                            help='Days of raw scans to keep (0 keeps everything)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Show what would be created and expired without changing anything')
+
+    def handle(self, *args, **options):
+        if is_partitioned(connection):
+            self.manage_partitions(options)
+        else:
+            self.stdout.write('ℹ️ RFIDScan is not partitioned on this database, expiring rows day by day')
+            self.expire_unpartitioned(options)
+
+    def manage_partitions(self, options):
+        interval = partition_interval()
+        dry_run = options['dry_run']
+
+        # 1. Future partitions, so new scans never land in the default partition
+        today = datetime.now(dt_timezone.utc).date()
+        last_day = today
+        for _ in range(options['ahead']):
+            last_day = next_partition_start(last_day, interval)
+        if dry_run:
+            self.stdout.write(f"Would ensure {interval} partitions from {today} to {last_day}")
+        else:
+            names = ensure_partitions(connection, today, last_day, interval)
+            self.stdout.write(f"✅ Partitions up to {last_day} in place ({len(names)} checked)")
+
+        # 2. Expired partitions: summarise, then detach and drop
+        if options['retention_days'] > 0:
+            cutoff = datetime.combine(
+                retention_cutoff(options['retention_days']), datetime.min.time(), tzinfo=dt_timezone.utc
+            )
+            for name, lower, upper in list_partitions(connection):
+                if upper > cutoff:
+                    break
+                if dry_run:
+                    self.stdout.write(f"Would summarise and drop {name} ({lower:%Y-%m-%d} – {upper:%Y-%m-%d})")
+                    continue
+                with transaction.atomic():
+                    summaries = summarize_scans(lower, upper)
+                    drop_partition(connection, name)
+                self.stdout.write(self.style.SUCCESS(f"🗑️ Dropped {name} after writing {summaries} summary rows"))
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(DEFAULT_PARTITION)}")
+            stray = cursor.fetchone()[0]
+        if stray:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {stray} scans are in {DEFAULT_PARTITION}; they fall outside every partition range"
+            ))
+
+    def expire_unpartitioned(self, options):
+        if options['retention_days'] <= 0:
+            self.stdout.write('Retention is disabled, nothing to expire')
+            return
+
+        cutoff = datetime.combine(
+            retention_cutoff(options['retention_days']), datetime.min.time(), tzinfo=dt_timezone.utc
+        )
+        # One day per transaction keeps each DELETE small
+        day_start = self.next_day_with_scans(None, cutoff)
+        if day_start is None:
+            self.stdout.write('Nothing older than the retention window')
+            return
+
+        while day_start is not None:
+            day_end = day_start + timedelta(days=1)
+            if options['dry_run']:
+                count = RFIDScan.objects.filter(created_at__gte=day_start, created_at__lt=day_end).count()
+                self.stdout.write(f"Would summarise and delete {count} scans from {day_start:%Y-%m-%d}")
+            else:
+                with transaction.atomic():
+                    summaries = summarize_scans(day_start, day_end)
+                    deleted, _ = RFIDScan.objects.filter(created_at__gte=day_start, created_at__lt=day_end).delete()
+                self.stdout.write(self.style.SUCCESS(
+                    f"🗑️ Deleted {deleted} scans from {day_start:%Y-%m-%d} after writing {summaries} summary rows"
+                ))
+            day_start = self.next_day_with_scans(day_end, cutoff)
+
+    def next_day_with_scans(self, after, cutoff):
+        """
+        Start (UTC midnight) of the oldest day before ``cutoff`` that still has scans.
+        """
+        scans = RFIDScan.objects.filter(created_at__lt=cutoff)
+        if after is not None:
+            scans = scans.filter(created_at__gte=after)
+        oldest = scans.order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is None:
+            return None
+        return datetime.combine(oldest.astimezone(dt_timezone.utc).date(), datetime.min.time(), tzinfo=dt_timezone.utc)
@@ -1,9 +1,39 @@
+import glob
+import multiprocessing
+import signal
+import sys
+import time
+
 import paho.mqtt.client as mqtt
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from django.utils import timezone
-from api.models import RFIDScan  
-import json
+from django.db import InterfaceError, OperationalError, connection, connections
+from api.dedup import ScanDeduplicator
+from api.ingest import InvalidScan, ScanBatchWriter, build_scan, save_spooled
+from api.spool import ScanSpool
+from api.tag_cache import tag_cache
+
+# Slots per worker in the shared stats array: received, written, failed
+STATS_FIELDS = 3
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _worker_main(options, index, counters):
+    """
+    Entry point of a --workers child process.
+    """
+    import django
+    django.setup()
+
+    # The supervisor stops workers with SIGTERM; treat it like Ctrl-C so the
+    # buffer is flushed before exiting.
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    ok = Command().run_subscriber(options, index=index, counters=counters)
+    sys.exit(0 if ok else 1)
+
 
 class Command(BaseCommand):
     help = 'Connects to EMQX as an MQTT subscriber and listens on /transaction'
@@ -14,23 +44,221 @@ class Command(BaseCommand):
         parser.add_argument('--username', type=str, default=getattr(settings, 'MQTT_USERNAME', 'django_subscriber'))
         parser.add_argument('--password', type=str, default=getattr(settings, 'MQTT_PASSWORD', ''))
         parser.add_argument('--topic', type=str, default=getattr(settings, 'MQTT_TOPIC', '/transaction'))
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'MQTT_BATCH_SIZE', 500),
+                            help='Number of scans written per bulk insert')
+        parser.add_argument('--flush-interval', type=float, default=getattr(settings, 'MQTT_FLUSH_INTERVAL', 1.0),
+                            help='Maximum seconds a scan waits in the buffer before being written')
+        parser.add_argument('--queue-size', type=int, default=getattr(settings, 'MQTT_QUEUE_SIZE', 10000),
+                            help='Maximum number of scans buffered in memory')
+        parser.add_argument('--stats-interval', type=float, default=getattr(settings, 'MQTT_STATS_INTERVAL', 10.0),
+                            help='Seconds between throughput reports (0 disables periodic reports)')
+        parser.add_argument('--dedup-window', type=float, default=getattr(settings, 'RFID_SCAN_DEDUP_WINDOW', 2.0),
+                            help='Seconds within which repeat reads of a tag from one reader are merged (0 disables)')
+        parser.add_argument('--spool-path', type=str, default=str(getattr(settings, 'MQTT_SPOOL_PATH', 'mqtt_scans.spool')),
+                            help='File that buffers scans while the database is unavailable')
+        parser.add_argument('--no-spool', action='store_true',
+                            help='Drop scans that cannot be written instead of spooling them')
+        parser.add_argument('--spool-retry-interval', type=float, default=getattr(settings, 'MQTT_SPOOL_RETRY_INTERVAL', 5.0),
+                            help='Seconds between attempts to replay the spool')
+        parser.add_argument('--replay-spool', action='store_true',
+                            help='Replay spooled scans into the database and exit (stop running subscribers first)')
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'MQTT_WORKERS', 1),
+                            help='Number of subscriber processes to run under a supervisor')
+        parser.add_argument('--share-group', type=str, default=None,
+                            help='Join the MQTT shared subscription $share/<group>/<topic> '
+                                 '(defaults to MQTT_SHARE_GROUP when --workers > 1)')
 
     def handle(self, *args, **options):
+        if options['replay_spool']:
+            self.replay_spool(options)
+        elif options['workers'] > 1:
+            if not options['share_group']:
+                options['share_group'] = getattr(settings, 'MQTT_SHARE_GROUP', 'django_subscribers')
+            self.supervise(options)
+        else:
+            self.run_subscriber(options)
+
+    def supervise(self, options):
+        """
+        Start one subscriber process per worker, restart any that exit and
+        print their combined throughput.
+        """
+        count = options['workers']
+        # Drop values that can't cross a process boundary (e.g. call_command's stdout)
+        worker_options = {key: value for key, value in options.items() if key not in ('stdout', 'stderr')}
+        counters = multiprocessing.Array('q', count * STATS_FIELDS)
+        # Totals of workers that already exited, so restarts don't reset the numbers
+        retired = [0] * STATS_FIELDS
+        processes = [None] * count
+        started_at = [0.0] * count
+        restart_delay = [1.0] * count
+        restart_at = [0.0] * count
+
+        def start(index):
+            process = multiprocessing.Process(
+                target=_worker_main,
+                args=(worker_options, index, counters),
+                name=f'mqtt-subscriber-{index}',
+            )
+            process.start()
+            processes[index] = process
+            started_at[index] = time.monotonic()
+
+        # Children open their own connections; don't share the parent's.
+        connections.close_all()
+        self.stdout.write(f"🚀 Starting {count} workers in shared group '{options['share_group']}'")
+        for index in range(count):
+            start(index)
+
+        began = time.monotonic()
+        next_report = began + options['stats_interval'] if options['stats_interval'] else None
+        try:
+            while True:
+                time.sleep(0.5)
+                now = time.monotonic()
+                for index, process in enumerate(processes):
+                    if process is not None:
+                        if process.is_alive():
+                            continue
+                        self.stdout.write(self.style.WARNING(
+                            f"💥 Worker {index} exited with code {process.exitcode}"
+                        ))
+                        base = index * STATS_FIELDS
+                        with counters.get_lock():
+                            for field in range(STATS_FIELDS):
+                                retired[field] += counters[base + field]
+                                counters[base + field] = 0
+                        # Back off when a worker keeps crashing right after start
+                        if now - started_at[index] < 10:
+                            restart_delay[index] = min(restart_delay[index] * 2, 30.0)
+                        else:
+                            restart_delay[index] = 1.0
+                        restart_at[index] = now + restart_delay[index]
+                        processes[index] = None
+                    if now >= restart_at[index]:
+                        self.stdout.write(f"🔁 Restarting worker {index}")
+                        start(index)
+
+                if next_report is not None and now >= next_report:
+                    self.report_combined(counters, retired, now - began)
+                    next_report = now + options['stats_interval']
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.NOTICE("🛑 Stopping workers..."))
+        finally:
+            for process in processes:
+                if process is not None and process.is_alive():
+                    process.terminate()
+            for process in processes:
+                if process is not None:
+                    process.join(30)
+            self.report_combined(counters, retired, time.monotonic() - began)
+
+    def replay_spool(self, options):
+        """
+        Replay the spool of every worker (``<path>`` and ``<path>.<n>``).
+        """
+        base = options['spool_path']
+        paths = {base}
+        for path in glob.glob(f"{glob.escape(base)}.*"):
+            for suffix in ('.replaying', '.offset', '.rejected'):
+                if path.endswith(suffix):
+                    path = path[:-len(suffix)]
+            paths.add(path)
+
+        def reject(scan, error):
+            self.stdout.write(self.style.WARNING(f"🚫 Set aside scan tag={str(scan.rfid_tag)[:120]!r}: {error}"))
+
+        total = 0
+        for path in sorted(paths):
+            spool = ScanSpool(path)
+            if not spool.pending():
+                continue
+            replayed, _ = spool.replay(
+                lambda scans: save_spooled(spool, scans, batch_size=options['batch_size'], reject=reject),
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(f"📼 Replayed {replayed} scans from {path}")
+            total += replayed
+        self.stdout.write(self.style.SUCCESS(f"💾 Replayed {total} spooled scans"))
+
+    def report_combined(self, counters, retired, elapsed):
+        totals = list(retired)
+        with counters.get_lock():
+            for offset in range(0, len(counters), STATS_FIELDS):
+                for field in range(STATS_FIELDS):
+                    totals[field] += counters[offset + field]
+        received, written, failed = totals
+        rate = written / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            f"📊 all workers: received={received} written={written} failed={failed} rate={rate:.1f}/s"
+        )
+
+    def run_subscriber(self, options, index=None, counters=None):
+        """
+        Run one subscriber until interrupted; returns False on a fatal error.
+        """
         broker = options['broker']
         port = options['port']
         username = options['username']
         password = options['password']
         topic = options['topic']
+        if options['share_group']:
+            topic = f"$share/{options['share_group']}/{topic}"
+
+        label = '' if index is None else f"[worker {index}] "
 
-        self.stdout.write(f"🔌 Connecting to {broker}:{port} as {username}...")
+        def report(message):
+            self.stdout.write(f"{label}{message}")
+
+        def publish_stats(stats):
+            # Expose this worker's totals to the supervisor
+            base = index * STATS_FIELDS
+            with counters.get_lock():
+                counters[base] = stats.received
+                counters[base + 1] = stats.written
+                counters[base + 2] = stats.failed
+
+        try:
+            warmed = tag_cache.warm()
+        except (OperationalError, InterfaceError) as e:
+            # Keep going: the writer spools until the database is back and
+            # the cache warms itself on the first successful write
+            connection.close()
+            report(self.style.WARNING(f"⚠️ Database unavailable, tag cache not warmed: {e}"))
+        else:
+            report(f"🏷️ Loaded {warmed} RFID tags into the tag cache")
+
+        spool = None
+        if not options['no_spool']:
+            # Each worker gets its own spool file
+            spool_path = options['spool_path'] if index is None else f"{options['spool_path']}.{index}"
+            spool = ScanSpool(spool_path)
+            if spool.pending():
+                report(f"📼 Found spooled scans in {spool_path}, they will be replayed first")
+
+        writer = ScanBatchWriter(
+            batch_size=options['batch_size'],
+            flush_interval=options['flush_interval'],
+            queue_size=options['queue_size'],
+            # Under a supervisor the parent prints the combined numbers
+            stats_interval=options['stats_interval'] if counters is None else 0,
+            report=report,
+            on_flush=publish_stats if counters is not None else None,
+            dedup=ScanDeduplicator(window=options['dedup_window']),
+            spool=spool,
+            retry_interval=options['spool_retry_interval'],
+        )
+        writer.start()
+
+        report(f"🔌 Connecting to {broker}:{port} as {username}...")
 
         def on_connect(client, userdata, flags, rc):
             if rc == 0:
-                self.stdout.write(self.style.SUCCESS("✅ Connected to MQTT broker"))
+                report(self.style.SUCCESS("✅ Connected to MQTT broker"))
                 client.subscribe(topic)
-                self.stdout.write(f"📡 Subscribed to {topic}")
+                report(f"📡 Subscribed to {topic}")
             else:
-                self.stdout.write(self.style.ERROR(f"❌ Connection failed with code {rc}"))
+                report(self.style.ERROR(f"❌ Connection failed with code {rc}"))
                 # rc meanings:
                 # 1: incorrect protocol version
                 # 2: invalid client ID
@@ -41,21 +269,23 @@ class Command(BaseCommand):
         def on_message(client, userdata, msg):
             try:
                 payload = msg.payload.decode()
-                self.stdout.write(f"📥 Received: {payload} on {msg.topic}")
-
-                # Save to database – adjust to your model
-                RFIDScan.objects.create(
-                    rfid_tag=payload,
-                    rfid=None,
-                    payload={"topic": msg.topic, "payload": payload, "qos": msg.qos},
-                    created_at=timezone.now()
-                )
-                self.stdout.write(self.style.SUCCESS("💾 Saved to database"))
+                if options['verbosity'] > 1:
+                    report(f"📥 Received: {payload} on {msg.topic}")
+
+                # Queued for the writer thread; it is saved with the next batch
+                writer.submit(build_scan(
+                    payload,
+                    topic=msg.topic,
+                    qos=msg.qos,
+                    raw=lambda: {"topic": msg.topic, "payload": payload, "qos": msg.qos},
+                ))
+            except InvalidScan as e:
+                report(self.style.WARNING(f"⚠️ Rejected message on {msg.topic}: {e}"))
             except Exception as e:
-                self.stdout.write(self.style.ERROR(f"⚠️ Error processing message: {e}"))
+                report(self.style.ERROR(f"⚠️ Error processing message: {e}"))
 
         def on_disconnect(client, userdata, rc):
-            self.stdout.write(self.style.WARNING(f"🔌 Disconnected (rc: {rc})"))
+            report(self.style.WARNING(f"🔌 Disconnected (rc: {rc})"))
 
         # Create MQTT client
         client = mqtt.Client()
@@ -66,11 +296,22 @@ class Command(BaseCommand):
         client.on_message = on_message
         client.on_disconnect = on_disconnect
 
+        ok = True
         try:
             client.connect(broker, port, 60)
             client.loop_forever()
         except KeyboardInterrupt:
-            self.stdout.write(self.style.NOTICE("🛑 Stopping subscriber..."))
+            report(self.style.NOTICE("🛑 Stopping subscriber..."))
             client.disconnect()
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"🔥 Fatal error: {e}"))
\ No newline at end of file
+            report(self.style.ERROR(f"🔥 Fatal error: {e}"))
+            ok = False
+        finally:
+            # Write whatever is still buffered before exiting
+            writer.stop()
+            if counters is not None:
+                publish_stats(writer.stats)
+            report(self.style.SUCCESS(
+                f"💾 Flushed {writer.stats.written} scans ({writer.stats.rate:.1f}/s)"
+            ))
+        return ok
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from api.rollups import rollup_lag, rollup_pending
+
+
+class Command(BaseCommand):
+    help = 'Fold new RFID scans into the hourly rollup table, starting after the stored watermark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Scans folded per transaction')
+        parser.add_argument('--lag', type=int, default=rollup_lag(),
+                            help='Fold scans once this many seconds have passed since a run saw them '
+                                 '(never less than the dedup window plus the flush interval)')
+        parser.add_argument('--follow', action='store_true',
+                            help='Keep running, catching up every --interval seconds')
+        parser.add_argument('--interval', type=float, default=30,
+                            help='Seconds between catch-up runs with --follow')
+
+    def handle(self, *args, **options):
+        while True:
+            consumed = rollup_pending(options['chunk_size'], options['lag'])
+            if consumed:
+                self.stdout.write(self.style.SUCCESS(f"📊 Rolled up {consumed} scans"))
+            elif not options['follow']:
+                self.stdout.write('Hourly rollup is up to date')
+            if not options['follow']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.NOTICE('🛑 Stopping rollup...'))
+                break
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The columns are added empty so existing rows are not rewritten during
+    # the deploy; backfill_scan_columns copies created_at into them in chunks.
+
+    dependencies = [
+        ('api', '0013_rfidscan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rfidscan',
+            name='first_seen',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='rfidscan',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='rfidscan',
+            name='last_seen',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='rfidscan',
+            name='first_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+        migrations.AlterField(
+            model_name='rfidscan',
+            name='last_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_rfidscan_hit_count_first_seen_last_seen'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rfidscan',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
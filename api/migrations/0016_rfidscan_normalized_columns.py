@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_alter_rfidscan_created_at'),
+    ]
+
+    # Existing rows are filled in afterwards, in chunks, by
+    # `manage.py backfill_scan_columns` rather than inside this migration.
+    operations = [
+        migrations.AddField(
+            model_name='rfidscan',
+            name='broker_ts',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rfidscan',
+            name='qos',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rfidscan',
+            name='reader_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='rfidscan',
+            name='topic',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='rfidscan',
+            name='payload',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
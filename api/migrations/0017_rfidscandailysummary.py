@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_rfidscan_normalized_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RFIDScanDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('rfid_tag', models.CharField(max_length=100)),
+                ('reader_id', models.CharField(blank=True, default='', max_length=100)),
+                ('scan_count', models.PositiveIntegerField(default=0)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rfid_tag', 'day'], name='scan_summary_tag_day_idx')],
+                'unique_together': {('day', 'rfid_tag', 'reader_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:05
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations
+
+from api.partitions import (
+    DEFAULT_PARTITION, PARENT_TABLE, ensure_partitions, is_partitioned,
+    next_partition_start, partition_interval,
+)
+
+LEGACY_TABLE = f'{PARENT_TABLE}_unpartitioned'
+SEQUENCE = f'{PARENT_TABLE}_part_id_seq'
+
+
+def partition_rfidscan(apps, schema_editor):
+    """
+    Rebuild api_rfidscan as a table range-partitioned on created_at.
+
+    PostgreSQL only; other databases keep the plain table.  Existing rows
+    are copied into the new partitions, so on a large table run this during
+    a maintenance window.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or is_partitioned(connection):
+        return
+
+    interval = partition_interval()
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(PARENT_TABLE)} RENAME TO {qn(LEGACY_TABLE)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(PARENT_TABLE)} "
+            f"(LIKE {qn(LEGACY_TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        # The partition key has to be part of the primary key
+        cursor.execute(f"ALTER TABLE {qn(PARENT_TABLE)} ADD PRIMARY KEY (id, created_at)")
+        cursor.execute(f"CREATE SEQUENCE {qn(SEQUENCE)} OWNED BY {qn(PARENT_TABLE)}.id")
+        cursor.execute(
+            f"SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {qn(LEGACY_TABLE)}), 0) + 1, false)",
+            [SEQUENCE],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(PARENT_TABLE)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)",
+            [SEQUENCE],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(PARENT_TABLE)} ADD CONSTRAINT api_rfidscan_rfid_id_fk_api_rfid_id "
+            f"FOREIGN KEY (rfid_id) REFERENCES {qn('api_rfid')} (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+        for column in ('rfid_tag', 'rfid_id', 'reader_id'):
+            cursor.execute(f"CREATE INDEX {qn(f'{PARENT_TABLE}_{column}_idx')} ON {qn(PARENT_TABLE)} ({column})")
+        cursor.execute(f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(PARENT_TABLE)} DEFAULT")
+
+        cursor.execute(f"SELECT MIN(created_at) FROM {qn(LEGACY_TABLE)}")
+        oldest = cursor.fetchone()[0]
+
+    today = datetime.now(dt_timezone.utc).date()
+    first_day = oldest.astimezone(dt_timezone.utc).date() if oldest else today
+    last_day = today
+    for _ in range(getattr(settings, 'RFID_SCAN_PARTITIONS_AHEAD', 3)):
+        last_day = next_partition_start(last_day, interval)
+    ensure_partitions(connection, first_day, last_day, interval)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {qn(PARENT_TABLE)} SELECT * FROM {qn(LEGACY_TABLE)}")
+        cursor.execute(f"DROP TABLE {qn(LEGACY_TABLE)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_rfidscandailysummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_rfidscan, migrations.RunPython.noop),
+    ]
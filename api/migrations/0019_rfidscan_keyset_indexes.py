@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_partition_rfidscan'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rfidscan',
+            name='reader_id',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='rfidscan',
+            name='rfid',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scans', to='api.rfid'),
+        ),
+        migrations.AlterField(
+            model_name='rfidscan',
+            name='rfid_tag',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='rfidscan',
+            index=models.Index(fields=['-created_at', '-id'], name='rfidscan_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfidscan',
+            index=models.Index(fields=['rfid_tag', '-created_at', '-id'], name='rfidscan_tag_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfidscan',
+            index=models.Index(fields=['reader_id', '-created_at', '-id'], name='rfidscan_reader_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rfidscan',
+            index=models.Index(fields=['rfid', '-created_at', '-id'], name='rfidscan_rfid_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_rfidscan_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RFIDScanHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('rfid_tag', models.CharField(max_length=100)),
+                ('reader_id', models.CharField(blank=True, default='', max_length=100)),
+                ('scan_count', models.PositiveIntegerField(default=0)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rfid_tag', 'hour'], name='scan_hourly_tag_hour_idx'), models.Index(fields=['reader_id', 'hour'], name='scan_hourly_reader_hour_idx')],
+                'unique_together': {('hour', 'rfid_tag', 'reader_id')},
+            },
+        ),
+    ]
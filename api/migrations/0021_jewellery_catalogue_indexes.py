@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_rfidscanhourly_rollupwatermark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jewellery',
+            index=models.Index(fields=['-created_at', '-id'], name='jewellery_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jewellery',
+            index=models.Index(fields=['category', 'sub_category', '-created_at'], name='jewellery_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jewellery',
+            index=models.Index(fields=['metal_type', '-created_at'], name='jewellery_metal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jewellery',
+            index=models.Index(fields=['collection_type', '-created_at'], name='jewellery_collection_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jewellery',
+            index=models.Index(fields=['status', '-created_at'], name='jewellery_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jewellery',
+            index=models.Index(fields=['design_number'], name='jewellery_design_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
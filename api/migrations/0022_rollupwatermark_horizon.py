@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_jewellery_catalogue_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='horizon_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='horizon_id',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,41 @@
+"""
+Reusable view mixins.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+
+class ConditionalListMixin:
+    """
+    Conditional GET for list views.
+
+    The ETag comes from one aggregate query over the filtered queryset: the
+    row count plus ``Max()`` of every field in ``validator_fields``.  A
+    client that sends back a matching ``If-None-Match`` gets ``304 Not
+    Modified`` without the list being serialized.  List related fields whose
+    data the serializer embeds, so edits to them change the ETag too.
+
+    No Last-Modified is sent: the newest timestamp does not move when a row
+    is deleted, so ``If-Modified-Since`` would serve stale lists.
+    """
+    validator_fields = ('updated_at',)
+
+    def get_etag(self, queryset):
+        aggregates = {f'latest_{index}': Max(field) for index, field in enumerate(self.validator_fields)}
+        values = queryset.order_by().aggregate(rows=Count('pk'), **aggregates)
+        stamps = [values[name] for name in aggregates]
+
+        # The full path keys the tag to the filter set and page
+        source = repr((self.request.get_full_path(), values['rows'], stamps))
+        return '"%s"' % hashlib.md5(source.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(self.filter_queryset(self.get_queryset()))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
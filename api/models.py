@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Company(models.Model):
     name = models.CharField(max_length=200)
@@ -121,6 +122,20 @@ class Jewellery(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Match the catalogue filters of JewelleryListCreateView, which
+        # pages newest first.  jewellery_id prefix search uses the index
+        # behind its unique constraint.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='jewellery_created_idx'),
+            models.Index(fields=['category', 'sub_category', '-created_at'], name='jewellery_category_idx'),
+            models.Index(fields=['metal_type', '-created_at'], name='jewellery_metal_idx'),
+            models.Index(fields=['collection_type', '-created_at'], name='jewellery_collection_idx'),
+            models.Index(fields=['status', '-created_at'], name='jewellery_status_idx'),
+            # varchar_pattern_ops lets PostgreSQL use it for LIKE 'prefix%'
+            models.Index(fields=['design_number'], name='jewellery_design_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return self.jewellery_id
 
@@ -154,17 +169,101 @@ class RFIDScan(models.Model):
     """
     Records every RFID scan event received via MQTT.
     """
-    rfid_tag = models.CharField(max_length=100, db_index=True)
+    rfid_tag = models.CharField(max_length=100)
     # Optional link to RFID model if the tag is known
     rfid = models.ForeignKey(
         'RFID',
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='scans'
+        related_name='scans',
+        db_index=False,  # covered by rfidscan_rfid_created_idx
     )
-    payload = models.JSONField()  # stores the full webhook payload for debugging
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Commonly queried envelope fields, promoted to typed columns
+    topic = models.CharField(max_length=255, blank=True, default='')
+    qos = models.PositiveSmallIntegerField(null=True, blank=True)
+    reader_id = models.CharField(max_length=100, blank=True, default='')  # EMQX clientid
+    broker_ts = models.DateTimeField(null=True, blank=True)  # when the broker received the message
+    # Raw envelope, only kept for malformed or sampled messages
+    # (see RFID_SCAN_PAYLOAD_MODE)
+    payload = models.JSONField(null=True, blank=True)
+    # Repeated reads of the same tag from the same reader within the dedup
+    # window are merged into one row (see api/dedup.py).  Rows stored before
+    # merging existed have NULL first/last_seen until backfill_scan_columns
+    # copies created_at into them.
+    hit_count = models.PositiveIntegerField(default=1)
+    first_seen = models.DateTimeField(default=timezone.now, null=True)
+    last_seen = models.DateTimeField(default=timezone.now, null=True)
+    # Not auto_now_add so replayed scans keep the time they were received
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Keyset pagination walks (created_at, id) newest first; each filter
+        # column leads its own index so filtered pages are range scans too
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='rfidscan_created_id_idx'),
+            models.Index(fields=['rfid_tag', '-created_at', '-id'], name='rfidscan_tag_created_idx'),
+            models.Index(fields=['reader_id', '-created_at', '-id'], name='rfidscan_reader_created_idx'),
+            models.Index(fields=['rfid', '-created_at', '-id'], name='rfidscan_rfid_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rfid_tag} at {self.created_at}"
+
+class RFIDScanDailySummary(models.Model):
+    """
+    Per-day totals of expired RFIDScan rows, written by the
+    manage_scan_partitions command before old partitions are dropped.
+    """
+    day = models.DateField()
+    rfid_tag = models.CharField(max_length=100)
+    reader_id = models.CharField(max_length=100, blank=True, default='')
+    scan_count = models.PositiveIntegerField(default=0)  # rows
+    hit_count = models.PositiveIntegerField(default=0)   # reads, including merged repeats
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['day', 'rfid_tag', 'reader_id']
+        indexes = [models.Index(fields=['rfid_tag', 'day'], name='scan_summary_tag_day_idx')]
+
+    def __str__(self):
+        return f"{self.rfid_tag} on {self.day}: {self.hit_count}"
+
+class RFIDScanHourly(models.Model):
+    """
+    Scan totals per hour, tag and reader, maintained incrementally from
+    RFIDScan by the rollup_scans command (see api/rollups.py).
+    """
+    hour = models.DateTimeField()  # start of the hour, UTC
+    rfid_tag = models.CharField(max_length=100)
+    reader_id = models.CharField(max_length=100, blank=True, default='')
+    scan_count = models.PositiveIntegerField(default=0)  # rows
+    hit_count = models.PositiveIntegerField(default=0)   # reads, including merged repeats
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['hour', 'rfid_tag', 'reader_id']
+        indexes = [
+            models.Index(fields=['rfid_tag', 'hour'], name='scan_hourly_tag_hour_idx'),
+            models.Index(fields=['reader_id', 'hour'], name='scan_hourly_reader_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rfid_tag} at {self.hour:%Y-%m-%d %H}:00: {self.hit_count}"
+
+class RollupWatermark(models.Model):
+    """
+    Highest source row id already folded into a rollup table.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    # Highest source id that existed at horizon_at; rows up to it are folded
+    # once the lag has passed since then (see api/rollups.py)
+    horizon_id = models.BigIntegerField(default=0)
+    horizon_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.rfid_tag} at {self.created_at}"
\ No newline at end of file
+        return f"{self.name} @ {self.last_id}"
@@ -0,0 +1,98 @@
+"""
+The Company -> Location -> Shop hierarchy as one nested document.
+
+``build_org_tree`` runs three queries whatever the size of the
+organisation: companies, locations and shops, each with its counts
+annotated as correlated subqueries and the levels joined with
+``prefetch_related``.  ``get_org_tree`` caches the result for
+``ORG_TREE_CACHE_TTL`` seconds; api/signals.py drops it once a change to
+any of ``ORG_TREE_MODELS`` is committed.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Company, Location, Profile, Role, Shop
+
+CACHE_KEY = 'org_tree'
+ORG_TREE_MODELS = (Company, Location, Shop, Role, Profile)
+
+
+def _count(model, field):
+    """
+    Number of ``model`` rows whose ``field`` is the outer row, as an annotation.
+    """
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def _counts(level):
+    return {
+        'roles_count': _count(Role, level),
+        'users_count': _count(Profile, f'role__{level}'),
+    }
+
+
+def _node(obj, **extra):
+    return {
+        'id': obj.id,
+        'name': obj.name,
+        'roles_count': obj.roles_count,
+        'users_count': obj.users_count,
+        **extra,
+    }
+
+
+def build_org_tree():
+    shops = Shop.objects.annotate(**_counts('shop')).order_by('name', 'id')
+    locations = (
+        Location.objects
+        .annotate(shops_count=_count(Shop, 'location'), **_counts('location'))
+        .order_by('name', 'id')
+        .prefetch_related(Prefetch('shops', queryset=shops))
+    )
+    companies = (
+        Company.objects
+        .annotate(
+            locations_count=_count(Location, 'company'),
+            shops_count=_count(Shop, 'location__company'),
+            **_counts('company'),
+        )
+        .order_by('name', 'id')
+        .prefetch_related(Prefetch('locations', queryset=locations))
+    )
+    return [
+        _node(
+            company,
+            locations_count=company.locations_count,
+            shops_count=company.shops_count,
+            locations=[
+                _node(
+                    location,
+                    shops_count=location.shops_count,
+                    shops=[_node(shop) for shop in location.shops.all()],
+                )
+                for location in company.locations.all()
+            ],
+        )
+        for company in companies
+    ]
+
+
+def get_org_tree():
+    tree = cache.get(CACHE_KEY)
+    if tree is None:
+        tree = build_org_tree()
+        cache.set(CACHE_KEY, tree, getattr(settings, 'ORG_TREE_CACHE_TTL', 300))
+    return tree
+
+
+def invalidate_org_tree():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,113 @@
+"""
+Pagination classes for the API.
+"""
+import base64
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    ``?page=`` / ``?page_size=`` pagination for list views of bounded tables.
+    """
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+
+
+class ScanCursorPagination(BasePagination):
+    """
+    Keyset pagination over ``(created_at, id)``, newest first.
+
+    The cursor encodes the last row of the previous page, so every page is
+    an index range scan on ``rfidscan_created_id_idx`` (or one of the
+    per-tag/reader/rfid indexes when filtered) no matter how deep the client
+    pages.  There is no total count; ``next`` is null on the last page.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'RFID_SCAN_PAGE_SIZE', 100)
+        self.max_page_size = getattr(settings, 'RFID_SCAN_MAX_PAGE_SIZE', 1000)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-created_at', '-id')
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            # The plain range bound lets the planner scan the index; the OR
+            # breaks ties between rows sharing a timestamp
+            queryset = queryset.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            timestamp, pk = raw.rsplit('|', 1)
+            created_at = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if created_at is None:
+            raise NotFound('Invalid cursor')
+        return created_at, pk
+
+    def encode_cursor(self, scan):
+        raw = f"{scan.created_at.isoformat()}|{scan.pk}"
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
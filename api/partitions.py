@@ -0,0 +1,183 @@
+"""
+Time-based partitioning of the RFIDScan table.
+
+On PostgreSQL ``api_rfidscan`` is a native range-partitioned table on
+``created_at`` (converted by migration 0018), with one partition per day or
+month (``RFID_SCAN_PARTITION_INTERVAL``) plus a default partition that
+catches anything outside the created ranges.  Expired partitions are
+summarised into ``RFIDScanDailySummary`` and dropped, which is O(1) instead
+of a huge DELETE.  Other databases keep a plain table and expire rows one
+day at a time.
+"""
+import re
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+PARENT_TABLE = 'api_rfidscan'
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def partition_interval():
+    interval = getattr(settings, 'RFID_SCAN_PARTITION_INTERVAL', 'month')
+    if interval not in ('day', 'month'):
+        raise ValueError(f"RFID_SCAN_PARTITION_INTERVAL must be 'day' or 'month', not {interval!r}")
+    return interval
+
+
+def partition_start(day, interval):
+    return day if interval == 'day' else day.replace(day=1)
+
+
+def next_partition_start(start, interval):
+    if interval == 'day':
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start, interval):
+    return f"{PARENT_TABLE}_p{start:%Y%m%d}" if interval == 'day' else f"{PARENT_TABLE}_p{start:%Y%m}"
+
+
+def _as_utc(day):
+    return datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [PARENT_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partition(connection, start, interval):
+    """
+    Create the partition starting at ``start`` unless it already exists.
+    Returns the partition name.
+    """
+    name = partition_name(start, interval)
+    end = next_partition_start(start, interval)
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(PARENT_TABLE)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [_as_utc(start), _as_utc(end)],
+        )
+    return name
+
+
+def ensure_partitions(connection, first_day, last_day, interval):
+    """
+    Create every partition needed to cover ``first_day`` .. ``last_day``.
+    """
+    created = []
+    start = partition_start(first_day, interval)
+    while start <= last_day:
+        created.append(create_partition(connection, start, interval))
+        start = next_partition_start(start, interval)
+    return created
+
+
+def list_partitions(connection):
+    """
+    Return ``(name, lower, upper)`` for every range partition, oldest first.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [PARENT_TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or '')
+        if not match:
+            continue  # the DEFAULT partition
+        lower, upper = (datetime.fromisoformat(value) for value in match.groups())
+        partitions.append((name, lower, upper))
+    partitions.sort(key=lambda partition: partition[1])
+    return partitions
+
+
+def drop_partition(connection, name):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(PARENT_TABLE)} DETACH PARTITION {qn(name)}")
+        cursor.execute(f"DROP TABLE {qn(name)}")
+
+
+def summarize_scans(start, end, chunk_size=5000):
+    """
+    Roll scans created in ``[start, end)`` up into daily summary rows.
+    Re-running for the same whole days overwrites rather than double counts.
+    """
+    from .models import RFIDScan, RFIDScanDailySummary
+
+    rows = (
+        RFIDScan.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'rfid_tag', 'reader_id')
+        .annotate(
+            scan_count=Count('id'),
+            total_hits=Sum('hit_count'),
+            first=Min(Coalesce('first_seen', 'created_at')),
+            last=Max(Coalesce('last_seen', 'created_at')),
+        )
+        .order_by()
+    )
+
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(RFIDScanDailySummary(
+            day=row['day'],
+            rfid_tag=row['rfid_tag'],
+            reader_id=row['reader_id'],
+            scan_count=row['scan_count'],
+            hit_count=row['total_hits'],
+            first_seen=row['first'],
+            last_seen=row['last'],
+        ))
+        if len(batch) >= chunk_size:
+            written += _save_summaries(batch)
+            batch = []
+    written += _save_summaries(batch)
+    return written
+
+
+def _save_summaries(batch):
+    from .models import RFIDScanDailySummary
+
+    if batch:
+        RFIDScanDailySummary.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['day', 'rfid_tag', 'reader_id'],
+            update_fields=['scan_count', 'hit_count', 'first_seen', 'last_seen'],
+        )
+    return len(batch)
+
+
+def retention_cutoff(retention_days, today=None):
+    """
+    First day that is still kept; everything created before it expires.
+    """
+    today = today or datetime.now(dt_timezone.utc).date()
+    return today - timedelta(days=retention_days)
+
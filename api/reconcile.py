@@ -0,0 +1,90 @@
+"""
+Stock-take reconciliation of swept RFID tags against the catalogue.
+
+Tags are resolved in a few bulk queries and the result is plain set
+arithmetic, so a sweep of thousands of tags reconciles in one request.
+"""
+from collections import defaultdict
+
+from .models import RFID, RFIDJewelleryMap, RFIDScan
+
+LOOKUP_CHUNK = 1000
+
+
+def _chunks(items, size=LOOKUP_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def tags_from_scans(since, until=None, readers=None):
+    """
+    Distinct tags scanned in ``[since, until)``, optionally from ``readers`` only.
+    """
+    scans = RFIDScan.objects.filter(created_at__gte=since)
+    if until is not None:
+        scans = scans.filter(created_at__lt=until)
+    if readers:
+        scans = scans.filter(reader_id__in=readers)
+    return set(scans.order_by().values_list('rfid_tag', flat=True).distinct())
+
+
+def reconcile_tags(tags):
+    """
+    Compare swept ``tags`` with the RFID table and the active mappings.
+
+    Returns a dict of sets/maps:
+      * ``present`` - swept tags mapped to active jewellery (tag -> jewellery_id)
+      * ``inactive`` - swept tags mapped to inactive jewellery (tag -> jewellery_id)
+      * ``unmapped`` - swept tags that are registered but have no active mapping
+      * ``unknown`` - swept tags that are not registered at all
+      * ``missing`` - tags expected on the floor (active tag mapped to active
+        jewellery) that the sweep did not see (tag -> jewellery_id)
+      * ``conflicts`` - swept or missing tags with several active mappings
+        (tag -> sorted jewellery_ids); they are reported here only, since
+        no single piece can be picked for them
+    """
+    scanned = {tag for tag in tags if tag}
+
+    known = set()
+    mapped = defaultdict(list)  # tag -> [(jewellery_id, jewellery status)]
+    for chunk in _chunks(scanned):
+        known.update(RFID.objects.filter(tag__in=chunk).values_list('tag', flat=True))
+        for tag, jewellery_id, status in (
+            RFIDJewelleryMap.objects
+            .filter(rfid__tag__in=chunk, status='active')
+            .values_list('rfid__tag', 'jewellery__jewellery_id', 'jewellery__status')
+        ):
+            mapped[tag].append((jewellery_id, status))
+
+    expected = defaultdict(list)
+    for tag, jewellery_id in (
+        RFIDJewelleryMap.objects
+        .filter(status='active', rfid__status='active', jewellery__status='active')
+        .values_list('rfid__tag', 'jewellery__jewellery_id')
+        .iterator(chunk_size=5000)
+    ):
+        expected[tag].append(jewellery_id)
+
+    conflicts = {
+        tag: sorted(jewellery_id for jewellery_id, _ in pieces)
+        for tag, pieces in mapped.items() if len(pieces) > 1
+    }
+    conflicts.update(
+        (tag, sorted(jewellery_ids))
+        for tag, jewellery_ids in expected.items()
+        if len(jewellery_ids) > 1 and tag not in scanned
+    )
+    single = {tag: pieces[0] for tag, pieces in mapped.items() if len(pieces) == 1}
+
+    return {
+        'present': {tag: jewellery_id for tag, (jewellery_id, status) in single.items() if status == 'active'},
+        'inactive': {tag: jewellery_id for tag, (jewellery_id, status) in single.items() if status != 'active'},
+        'unmapped': known - mapped.keys(),
+        'unknown': scanned - known,
+        'missing': {
+            tag: jewellery_ids[0] for tag, jewellery_ids in expected.items()
+            if tag not in scanned and len(jewellery_ids) == 1
+        },
+        'conflicts': conflicts,
+    }
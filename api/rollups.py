@@ -0,0 +1,159 @@
+"""
+Incremental hourly rollup of RFIDScan into RFIDScanHourly.
+
+Scans are folded in id order past a stored watermark, so each run only
+reads rows it has not seen, and each row is read once.  Ids are handed out
+before commit, so a lower id can become visible after a higher one; and
+dedup merges may still add hits to a freshly written row.  So a run does
+not fold everything it sees: it records the highest id that exists (the
+horizon) with the time, and only rows up to a horizon recorded at least
+the lag ago are folded.  A new horizon is only taken once the previous one
+has settled and been folded, so a scan reaches the hourly table between one
+and two lags after it was written.  Anything with a lower id was inserted before the
+horizon was taken and has committed by then.  That holds for spool-replayed
+rows too, whose created_at is old.  A row only takes merges for the dedup
+window after its first read (see api/dedup.py), and they are written at the
+writer's next flush, so the lag never drops below that
+(``min_rollup_lag``).
+
+Transactions open for longer than the lag, and merges the subscriber holds
+back while the database is unreachable for longer than that, are missed:
+their rows (or extra hits) are in RFIDScan but not in the hourly table.
+"""
+import math
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+HOURLY_WATERMARK = 'rfidscan_hourly'
+
+
+def min_rollup_lag():
+    """
+    Seconds after which no dedup merge reaches a scan any more: the dedup
+    window plus the longest writer flush interval.
+    """
+    window = getattr(settings, 'RFID_SCAN_DEDUP_WINDOW', 2.0)
+    if window <= 0:
+        return 0
+    flush = max(
+        getattr(settings, 'MQTT_FLUSH_INTERVAL', 1.0),
+        getattr(settings, 'MQTT_ASYNC_FLUSH_INTERVAL', 0.05),
+    )
+    return math.ceil(window + flush)
+
+
+def rollup_lag():
+    return max(getattr(settings, 'RFID_SCAN_ROLLUP_LAG', 60), min_rollup_lag())
+
+
+def rollup_chunk(chunk_size=5000, lag=None):
+    """
+    Fold the next chunk of scans into the hourly table.
+    Returns the number of scans consumed (0 when caught up).
+    """
+    from .models import RFIDScan, RollupWatermark
+
+    lag = rollup_lag() if lag is None else max(lag, min_rollup_lag())
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=lag)
+
+    with transaction.atomic():
+        # Locking the watermark serialises concurrent runs
+        RollupWatermark.objects.get_or_create(name=HOURLY_WATERMARK)
+        watermark = RollupWatermark.objects.select_for_update().get(name=HOURLY_WATERMARK)
+
+        settled = watermark.horizon_at is not None and watermark.horizon_at <= cutoff
+        if not settled or watermark.last_id >= watermark.horizon_id:
+            if watermark.horizon_at is None or settled:
+                # Caught up: take a new horizon to fold once it has settled
+                latest = RFIDScan.objects.aggregate(last=Max('id'))['last']
+                watermark.horizon_id = max(latest or 0, watermark.last_id)
+                watermark.horizon_at = now
+                watermark.save(update_fields=['horizon_id', 'horizon_at', 'updated_at'])
+            return 0
+
+        pending = RFIDScan.objects.filter(id__gt=watermark.last_id, id__lte=watermark.horizon_id)
+        upper = pending.order_by('id').values_list('id', flat=True)[chunk_size - 1:chunk_size].first()
+        if upper is None:
+            upper = watermark.horizon_id
+
+        batch = pending.filter(id__lte=upper)
+        consumed = batch.count()
+        buckets = (
+            batch
+            .annotate(bucket=TruncHour('created_at', tzinfo=dt_timezone.utc))
+            .values('bucket', 'rfid_tag', 'reader_id')
+            .annotate(
+                scans=Count('id'),
+                hits=Sum('hit_count'),
+                first=Min(Coalesce('first_seen', 'created_at')),
+                last=Max(Coalesce('last_seen', 'created_at')),
+            )
+            .order_by()
+        )
+        _merge_buckets(list(buckets))
+
+        watermark.last_id = upper
+        watermark.save(update_fields=['last_id', 'updated_at'])
+    return consumed
+
+
+def _merge_buckets(rows):
+    """
+    Add aggregated rows onto the hourly table, creating missing buckets.
+    """
+    from .models import RFIDScanHourly
+
+    if not rows:
+        return
+    existing = {
+        (bucket.hour, bucket.rfid_tag, bucket.reader_id): bucket
+        for bucket in RFIDScanHourly.objects.filter(
+            hour__in={row['bucket'] for row in rows},
+            rfid_tag__in={row['rfid_tag'] for row in rows},
+        )
+    }
+
+    changed, created = [], []
+    for row in rows:
+        bucket = existing.get((row['bucket'], row['rfid_tag'], row['reader_id']))
+        if bucket is None:
+            created.append(RFIDScanHourly(
+                hour=row['bucket'],
+                rfid_tag=row['rfid_tag'],
+                reader_id=row['reader_id'],
+                scan_count=row['scans'],
+                hit_count=row['hits'],
+                first_seen=row['first'],
+                last_seen=row['last'],
+            ))
+            continue
+        bucket.scan_count += row['scans']
+        bucket.hit_count += row['hits']
+        bucket.first_seen = min(bucket.first_seen, row['first'])
+        bucket.last_seen = max(bucket.last_seen, row['last'])
+        changed.append(bucket)
+
+    RFIDScanHourly.objects.bulk_update(changed, ['scan_count', 'hit_count', 'first_seen', 'last_seen'])
+    RFIDScanHourly.objects.bulk_create(created)
+
+
+def rollup_pending(chunk_size=5000, lag=None, max_chunks=None):
+    """
+    Fold chunks until caught up (or ``max_chunks`` ran).
+    Returns the number of scans consumed.
+    """
+    total = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        consumed = rollup_chunk(chunk_size, lag)
+        if not consumed:
+            break
+        total += consumed
+        chunks += 1
+    return total
@@ -8,16 +8,30 @@ from .models import (
     Jewellery, RFID, RFIDJewelleryMap, RFIDScan
 )
 
+
+def annotated_count(obj, name, relation):
+    """
+    Value of the ``name`` Count annotation added by the list/detail views,
+    or a COUNT query for instances loaded elsewhere (e.g. just created).
+    """
+    value = getattr(obj, name, None)
+    if value is None:
+        value = getattr(obj, relation).count()
+    return value
+
 class RoleSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
     location_name = serializers.CharField(source='location.name', read_only=True)
     shop_name = serializers.CharField(source='shop.name', read_only=True)
-    users_count = serializers.IntegerField(source='profiles.count', read_only=True)
+    users_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Role
         fields = '__all__'
 
+    def get_users_count(self, obj):
+        return annotated_count(obj, 'users_count', 'profiles')
+
 class ProfileSerializer(serializers.ModelSerializer):
     role = serializers.PrimaryKeyRelatedField(queryset=Role.objects.all(), allow_null=True, required=False)
     role_details = RoleSerializer(source='role', read_only=True)
@@ -52,6 +66,38 @@ class UserSerializer(WritableNestedModelSerializer):
         # The mixin handles nested profile updates
         return super().update(instance, validated_data)
 
+class UserListSerializer(serializers.ModelSerializer):
+    """
+    Read-only counterpart of UserSerializer for the users list: same shape,
+    without the writable-nested machinery.  Expects the queryset built by
+    UserListCreateView (profile and role joined, ``role_users_count``
+    annotated) so a page of users costs a single query.
+    """
+    profile = ProfileSerializer(read_only=True)
+    role_details = RoleSerializer(source='profile.role', read_only=True)
+    name = serializers.SerializerMethodField()
+    created_at = serializers.DateTimeField(source='date_joined', read_only=True)
+
+    class Meta:
+        model = User
+        fields = [
+            'id', 'username', 'email', 'name', 'created_at',
+            'profile', 'role_details'
+        ]
+        read_only_fields = fields
+
+    def get_name(self, obj):
+        return obj.get_full_name() or obj.username
+
+    def to_representation(self, instance):
+        # Hand the per-role user count annotated on the user to the role,
+        # where RoleSerializer looks for it
+        profile = getattr(instance, 'profile', None)  # None when the user has no profile
+        role = profile.role if profile is not None else None
+        if role is not None and hasattr(instance, 'role_users_count'):
+            role.users_count = instance.role_users_count
+        return super().to_representation(instance)
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
@@ -69,20 +115,26 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 class CompanySerializer(serializers.ModelSerializer):
-    locations_count = serializers.IntegerField(source='locations.count', read_only=True)
+    locations_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Company
         fields = ['id', 'name', 'locations_count', 'created_at']
 
+    def get_locations_count(self, obj):
+        return annotated_count(obj, 'locations_count', 'locations')
+
 class LocationSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
-    shops_count = serializers.IntegerField(source='shops.count', read_only=True)
+    shops_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Location
         fields = ['id', 'name', 'company', 'company_name', 'shops_count', 'created_at']
 
+    def get_shops_count(self, obj):
+        return annotated_count(obj, 'shops_count', 'shops')
+
 class ShopSerializer(serializers.ModelSerializer):
     location_name = serializers.CharField(source='location.name', read_only=True)
     company_name = serializers.CharField(source='location.company.name', read_only=True)
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from django.contrib.auth.models import User
+
+from . import dashboard, org_tree
+from .authentication import user_cache
+from .models import RFID, Profile, Role
+from .permissions import permission_cache
+from .tag_cache import tag_cache
+
+
+# Keep the ingestion tag cache in step with the RFID table
+@receiver(post_save, sender=RFID)
+def cache_rfid_tag(sender, instance, **kwargs):
+    tag_cache.store(instance.tag, instance.pk)
+
+
+@receiver(post_delete, sender=RFID)
+def forget_rfid_tag(sender, instance, **kwargs):
+    tag_cache.forget(instance.pk)
+
+
+# Keep the cached users and permission masks in step with users, profiles
+# and roles
+@receiver([post_save, post_delete], sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    user_cache.forget(instance.pk)
+    permission_cache.forget(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def forget_cached_profile_user(sender, instance, **kwargs):
+    user_cache.forget(instance.user_id)
+    permission_cache.forget(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Role)
+def forget_cached_role_users(sender, instance, **kwargs):
+    user_cache.forget_role(instance.pk)
+    permission_cache.forget_role(instance.pk)
+
+
+# Drop cached dashboard widgets once a change to their data is committed
+def invalidate_dashboard(sender, **kwargs):
+    names = dashboard.widgets_for_model(sender)
+    transaction.on_commit(lambda: dashboard.invalidate_widgets(names))
+
+
+for _model in {model for models in dashboard.WIDGET_MODELS.values() for model in models}:
+    post_save.connect(invalidate_dashboard, sender=_model, dispatch_uid=f'dashboard-{_model._meta.label}-save')
+    post_delete.connect(invalidate_dashboard, sender=_model, dispatch_uid=f'dashboard-{_model._meta.label}-delete')
+
+
+# Drop the cached organisation tree once a hierarchy change is committed
+def invalidate_org_tree(sender, **kwargs):
+    transaction.on_commit(org_tree.invalidate_org_tree)
+
+
+for _model in org_tree.ORG_TREE_MODELS:
+    post_save.connect(invalidate_org_tree, sender=_model, dispatch_uid=f'org-tree-{_model._meta.label}-save')
+    post_delete.connect(invalidate_org_tree, sender=_model, dispatch_uid=f'org-tree-{_model._meta.label}-delete')
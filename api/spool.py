@@ -0,0 +1,142 @@
+"""
+Local append-only spool for scans the subscriber could not write.
+
+While the database is unavailable, batches are appended to a spool file
+(one compact JSON array per line) instead of being dropped.  Once the
+database is back they are replayed in arrival order with batched inserts.
+
+Replay moves the spool to ``<path>.replaying`` so new scans can keep being
+appended to ``<path>``, and records the byte offset of every committed
+batch in ``<path>.offset`` so an interrupted replay resumes where it
+stopped instead of inserting rows twice.  Rows the database refuses are
+moved to ``<path>.rejected`` so they cannot hold up the rest.
+"""
+import json
+import os
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from .models import RFIDScan
+
+
+class ScanSpool:
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.replay_path = self.path.with_name(self.path.name + '.replaying')
+        self.offset_path = self.path.with_name(self.path.name + '.offset')
+        self.rejected_path = self.path.with_name(self.path.name + '.rejected')
+
+    def append(self, scans, path=None):
+        if not scans:
+            return
+        path = path or self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for scan in scans:
+                f.write(self.encode(scan) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def quarantine(self, scans):
+        """
+        Set aside rows the database refused, in the spool's line format.
+        """
+        self.append(scans, path=self.rejected_path)
+
+    def pending(self):
+        return self._has_data(self.replay_path) or self._has_data(self.path)
+
+    def replay(self, write, batch_size=500, max_batches=None):
+        """
+        Feed spooled scans to ``write`` in order, ``batch_size`` at a time.
+        ``write`` may return how many of the scans it stored.
+
+        Returns ``(replayed, drained)``.  Exceptions from ``write`` propagate
+        with the progress made so far already recorded.
+        """
+        replayed = 0
+        batches = 0
+        while True:
+            if not self.replay_path.exists():
+                if not self._has_data(self.path):
+                    return replayed, True
+                os.replace(self.path, self.replay_path)
+                self._save_offset(0)
+
+            with open(self.replay_path, 'rb') as f:
+                f.seek(self._load_offset())
+                while True:
+                    if max_batches is not None and batches >= max_batches:
+                        return replayed, False
+                    lines = []
+                    for line in f:
+                        lines.append(line)
+                        if len(lines) >= batch_size:
+                            break
+                    if not lines:
+                        break
+                    scans = [scan for scan in map(self.decode, lines) if scan is not None]
+                    written = write(scans) if scans else 0
+                    self._save_offset(f.tell())
+                    replayed += len(scans) if written is None else written
+                    batches += 1
+
+            self.replay_path.unlink()
+            self.offset_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def encode(scan):
+        return json.dumps([
+            scan.rfid_tag,
+            scan.first_seen.timestamp(),
+            scan.last_seen.timestamp(),
+            scan.hit_count,
+            scan.topic,
+            scan.qos,
+            scan.reader_id,
+            scan.broker_ts.timestamp() if scan.broker_ts else None,
+            scan.payload,
+        ], separators=(',', ':'))
+
+    @staticmethod
+    def decode(line):
+        try:
+            fields = json.loads(line)
+            if len(fields) == 5:
+                # Spooled before the envelope columns existed
+                tag, first_seen, last_seen, hit_count, payload = fields
+                topic, qos, reader_id, broker_ts = '', None, '', None
+            else:
+                tag, first_seen, last_seen, hit_count, topic, qos, reader_id, broker_ts, payload = fields
+        except (TypeError, ValueError):
+            # A torn last line from a crash mid-append; nothing to recover
+            return None
+        first_seen = datetime.fromtimestamp(first_seen, tz=dt_timezone.utc)
+        return RFIDScan(
+            rfid_tag=tag,
+            topic=topic,
+            qos=qos,
+            reader_id=reader_id,
+            broker_ts=datetime.fromtimestamp(broker_ts, tz=dt_timezone.utc) if broker_ts else None,
+            payload=payload,
+            hit_count=hit_count,
+            first_seen=first_seen,
+            last_seen=datetime.fromtimestamp(last_seen, tz=dt_timezone.utc),
+            created_at=first_seen,
+        )
+
+    def _has_data(self, path):
+        try:
+            return path.stat().st_size > 0
+        except FileNotFoundError:
+            return False
+
+    def _load_offset(self):
+        try:
+            return int(self.offset_path.read_text() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _save_offset(self, offset):
+        self.offset_path.write_text(str(offset))
@@ -0,0 +1,197 @@
+"""
+Live scan fan-out for the SSE endpoint (``/api/rfid-scans/stream/``).
+
+Scans reach the database from several processes (webhook workers, the
+MQTT subscriber), so each ASGI process runs one ``ScanHub`` that tails
+RFIDScan by id and hands every new row to the connected clients.  The
+database sees one small query per poll interval however many clients are
+listening.  Each client has a bounded queue; a client that falls behind is
+told to reconnect and catches up from its Last-Event-ID instead of
+holding unbounded memory.
+"""
+import asyncio
+import json
+import weakref
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+ScanEvent = namedtuple('ScanEvent', 'id tag reader data')
+
+
+def stream_setting(name, default):
+    return getattr(settings, f'RFID_SCAN_STREAM_{name}', default)
+
+
+def reader_shops():
+    """
+    Mapping of reader id (EMQX clientid) to shop id, from RFID_READER_SHOPS.
+    """
+    return {reader: str(shop) for reader, shop in getattr(settings, 'RFID_READER_SHOPS', {}).items()}
+
+
+def readers_for_shop(shop_id):
+    return {reader for reader, shop in reader_shops().items() if shop == str(shop_id)}
+
+
+def fetch_events(after_id, limit, tags=None, readers=None):
+    """
+    Serialized scans with an id above ``after_id``, oldest first.
+    """
+    from .models import RFIDScan
+    from .serializers import RFIDScanSerializer
+
+    scans = RFIDScan.objects.filter(id__gt=after_id)
+    if tags:
+        scans = scans.filter(rfid_tag__in=tags)
+    if readers:
+        scans = scans.filter(reader_id__in=readers)
+    scans = list(scans.order_by('id')[:limit])
+    return [
+        ScanEvent(scan.id, scan.rfid_tag, scan.reader_id, json.dumps(data, cls=JSONEncoder))
+        for scan, data in zip(scans, RFIDScanSerializer(scans, many=True).data)
+    ]
+
+
+def latest_scan_id():
+    from .models import RFIDScan
+
+    return RFIDScan.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+class ScanSubscriber:
+    """
+    One connected client: its filters and a bounded event queue.
+    """
+
+    def __init__(self, tags=None, readers=None, size=None):
+        self.tags = set(tags or ())
+        self.readers = set(readers or ())
+        self.queue = asyncio.Queue(maxsize=size or stream_setting('QUEUE_SIZE', 1000))
+        self.overflowed = False
+
+    def matches(self, event):
+        if self.tags and event.tag not in self.tags:
+            return False
+        if self.readers and event.reader not in self.readers:
+            return False
+        return True
+
+    def offer(self, event):
+        if self.overflowed or not self.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The stream ends once the queued events are sent and the
+            # client resumes from the database
+            self.overflowed = True
+
+
+class ScanHub:
+    """
+    Polls for new scans while at least one client is subscribed.
+    """
+
+    def __init__(self, interval=None, batch_size=None):
+        self.interval = interval or stream_setting('POLL_INTERVAL', 0.5)
+        self.batch_size = batch_size or stream_setting('BATCH_SIZE', 500)
+        self.subscribers = set()
+        self.last_id = None
+        self._task = None
+
+    def subscribe(self, subscriber):
+        self.subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def _poll(self):
+        try:
+            if self.last_id is None:
+                self.last_id = await sync_to_async(latest_scan_id)()
+            while self.subscribers:
+                # Ids are assigned before commit, so a row committing after a
+                # higher id was seen is only delivered to resuming clients
+                events = await sync_to_async(fetch_events)(self.last_id, self.batch_size)
+                for event in events:
+                    for subscriber in list(self.subscribers):
+                        subscriber.offer(event)
+                if events:
+                    self.last_id = events[-1].id
+                if len(events) < self.batch_size:
+                    await asyncio.sleep(self.interval)
+        finally:
+            # Start from the tail again when the next client arrives
+            self.last_id = None
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_scan_hub():
+    """
+    Return the hub bound to the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = ScanHub()
+    return hub
+
+
+def sse_message(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def scan_event_stream(subscriber, hub, last_event_id=None):
+    """
+    SSE body: the backlog after ``last_event_id`` followed by live scans.
+    """
+    heartbeat = stream_setting('HEARTBEAT', 15)
+    backlog_limit = stream_setting('BACKLOG', 1000)
+    hub.subscribe(subscriber)
+    try:
+        sent_id = last_event_id or 0
+        if last_event_id is not None:
+            # Live events are already queueing, so nothing falls between
+            # the backlog and the stream; duplicates are skipped by id
+            backlog = await sync_to_async(fetch_events)(
+                last_event_id, backlog_limit + 1, subscriber.tags, subscriber.readers,
+            )
+            if len(backlog) > backlog_limit:
+                yield sse_message(json.dumps({'reason': 'backlog too long'}), event='reset')
+                return
+            for event in backlog:
+                yield sse_message(event.data, event='scan', event_id=event.id)
+                sent_id = event.id
+        else:
+            yield sse_message(json.dumps({'status': 'connected'}), event='ready')
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if subscriber.overflowed:
+                    break
+                yield ': ping\n\n'
+                continue
+            if event.id > sent_id:
+                yield sse_message(event.data, event='scan', event_id=event.id)
+                sent_id = event.id
+            if subscriber.overflowed and subscriber.queue.empty():
+                break
+        yield sse_message(json.dumps({'reason': 'client too slow'}), event='overflow')
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,135 @@
+"""
+In-process cache mapping RFID tag strings to ``RFID`` primary keys.
+
+Scan ingestion needs the ``RFID`` foreign key for every message; looking it
+up per message costs a query each time.  The cache is warmed from the
+``RFID`` table in a single query, kept current by the signal handlers in
+``api.signals`` and remembers unknown tags so repeated misses stay cheap.
+
+Entries expire after a TTL so that changes made by other processes (which
+don't fire signals here) are picked up eventually; ``save_scans`` also drops
+and re-resolves tags whose cached pk turns out to be gone.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import RFID
+
+
+class TagCache:
+    """
+    Bounded LRU of ``tag -> pk`` (``None`` for tags known not to exist).
+    """
+
+    def __init__(self, max_size=None, ttl=None, negative_ttl=None):
+        self.max_size = max_size or getattr(settings, 'RFID_TAG_CACHE_SIZE', 100000)
+        self.ttl = ttl or getattr(settings, 'RFID_TAG_CACHE_TTL', 300)
+        self.negative_ttl = negative_ttl or getattr(settings, 'RFID_TAG_CACHE_NEGATIVE_TTL', 30)
+        self._entries = OrderedDict()  # tag -> (pk or None, expires_at)
+        self._tags_by_pk = {}
+        self._lock = threading.Lock()
+        self._warmed = False
+
+    def warm(self):
+        """
+        Load up to ``max_size`` tags from the database in one query.
+        """
+        rows = list(RFID.objects.values_list('tag', 'pk')[:self.max_size])
+        with self._lock:
+            for tag, pk in rows:
+                self._put(tag, pk)
+            self._warmed = True
+        return len(rows)
+
+    def resolve(self, tag):
+        """
+        Return the ``RFID`` pk for ``tag`` or ``None`` if the tag is unknown.
+        """
+        return self.resolve_many([tag])[tag]
+
+    def resolve_many(self, tags):
+        """
+        Resolve several tags at once; misses are fetched with one ``IN`` query.
+        """
+        if not self._warmed:
+            self.warm()
+
+        now = time.monotonic()
+        resolved = {}
+        missing = set()
+        with self._lock:
+            for tag in tags:
+                if tag in resolved or tag in missing:
+                    continue
+                entry = self._entries.get(tag)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(tag)
+                    resolved[tag] = entry[0]
+                else:
+                    missing.add(tag)
+
+        if missing:
+            found = dict(RFID.objects.filter(tag__in=missing).values_list('tag', 'pk'))
+            with self._lock:
+                for tag in missing:
+                    pk = found.get(tag)
+                    self._put(tag, pk)
+                    resolved[tag] = pk
+        return resolved
+
+    def store(self, tag, pk):
+        """
+        Record that ``tag`` now belongs to ``pk`` (create or rename).
+        """
+        with self._lock:
+            old_tag = self._tags_by_pk.get(pk)
+            if old_tag is not None and old_tag != tag:
+                self._put(old_tag, None)
+            self._put(tag, pk)
+
+    def forget(self, pk):
+        """
+        Record that the ``RFID`` row ``pk`` was deleted.
+        """
+        with self._lock:
+            tag = self._tags_by_pk.get(pk)
+            if tag is not None:
+                self._put(tag, None)
+
+    def discard(self, tags):
+        """
+        Drop ``tags`` so their next lookup goes to the database.
+        """
+        with self._lock:
+            for tag in set(tags):
+                entry = self._entries.pop(tag, None)
+                if entry is not None and entry[0] is not None and self._tags_by_pk.get(entry[0]) == tag:
+                    del self._tags_by_pk[entry[0]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags_by_pk.clear()
+            self._warmed = False
+
+    def _put(self, tag, pk):
+        # Caller holds the lock.
+        old = self._entries.pop(tag, None)
+        if old is not None and old[0] is not None and self._tags_by_pk.get(old[0]) == tag:
+            del self._tags_by_pk[old[0]]
+
+        ttl = self.ttl if pk is not None else self.negative_ttl
+        self._entries[tag] = (pk, time.monotonic() + ttl)
+        if pk is not None:
+            self._tags_by_pk[pk] = tag
+
+        while len(self._entries) > self.max_size:
+            evicted_tag, (evicted_pk, _) = self._entries.popitem(last=False)
+            if evicted_pk is not None and self._tags_by_pk.get(evicted_pk) == evicted_tag:
+                del self._tags_by_pk[evicted_pk]
+
+
+tag_cache = TagCache()
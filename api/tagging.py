@@ -0,0 +1,170 @@
+"""
+Bulk RFID-to-jewellery tagging.
+
+Both entry points resolve jewellery and tags with a handful of queries and
+write every mapping in one transaction.  RFID rows are locked before their
+mappings are checked, so concurrent tagging stations never hand the same
+tag to two items: explicit pairs wait for the lock, while allocation
+claims free tags with ``SELECT ... FOR UPDATE SKIP LOCKED`` and simply
+takes the next ones another station is not holding.
+"""
+from django.db import transaction
+
+from .models import Jewellery, RFID, RFIDJewelleryMap
+
+
+def _active_maps(rfid_ids):
+    """
+    rfid id -> jewellery_id of the active mapping, read after locking.
+    """
+    return dict(
+        RFIDJewelleryMap.objects
+        .filter(rfid_id__in=rfid_ids, status='active')
+        .values_list('rfid_id', 'jewellery__jewellery_id')
+    )
+
+
+def _save_pairs(pairs, user):
+    """
+    Insert or reactivate ``(jewellery_pk, rfid_pk)`` mappings; returns a
+    status per pair.  Caller holds the RFID row locks.
+    """
+    existing = {
+        (mapping.jewellery_id, mapping.rfid_id): mapping
+        for mapping in RFIDJewelleryMap.objects.filter(
+            jewellery_id__in={jewellery_pk for jewellery_pk, _ in pairs},
+            rfid_id__in={rfid_pk for _, rfid_pk in pairs},
+        )
+    }
+    created, reactivated, statuses = [], [], []
+    for pair in pairs:
+        mapping = existing.get(pair)
+        if mapping is None:
+            created.append(RFIDJewelleryMap(jewellery_id=pair[0], rfid_id=pair[1], added_by=user))
+            statuses.append('created')
+        elif mapping.status != 'active':
+            mapping.status = 'active'
+            reactivated.append(mapping)
+            statuses.append('reactivated')
+        else:
+            statuses.append('exists')
+    RFIDJewelleryMap.objects.bulk_create(created)
+    for mapping in reactivated:
+        mapping.save(update_fields=['status', 'updated_at'])
+    return statuses
+
+
+def map_pairs(items, user=None):
+    """
+    Map explicit ``{'jewellery_id', 'tag'}`` items; returns one result per item.
+    """
+    results = [{'index': index, 'jewellery_id': item.get('jewellery_id'), 'tag': item.get('tag')}
+               for index, item in enumerate(items)]
+
+    with transaction.atomic():
+        jewellery = dict(
+            Jewellery.objects
+            .filter(jewellery_id__in={result['jewellery_id'] for result in results})
+            .values_list('jewellery_id', 'pk')
+        )
+        # Lock in id order so two stations cannot deadlock on the same tags
+        rfids = {
+            rfid.tag: rfid
+            for rfid in RFID.objects.select_for_update()
+            .filter(tag__in={result['tag'] for result in results})
+            .order_by('pk')
+        }
+        mapped = _active_maps([rfid.pk for rfid in rfids.values()])
+
+        pending, seen_tags = [], set()
+        for result in results:
+            rfid = rfids.get(result['tag'])
+            jewellery_pk = jewellery.get(result['jewellery_id'])
+            if jewellery_pk is None:
+                result.update(status='error', error='Unknown jewellery_id')
+            elif rfid is None:
+                result.update(status='error', error='Unknown tag')
+            elif rfid.status != 'active':
+                result.update(status='error', error='Tag is inactive')
+            elif rfid.pk in mapped and mapped[rfid.pk] != result['jewellery_id']:
+                result.update(status='error', error=f"Tag is mapped to {mapped[rfid.pk]}")
+            elif result['tag'] in seen_tags:
+                result.update(status='error', error='Tag repeated in this request')
+            else:
+                pending.append((result, (jewellery_pk, rfid.pk)))
+            seen_tags.add(result['tag'])
+
+        statuses = _save_pairs([pair for _, pair in pending], user)
+        for (result, _), status in zip(pending, statuses):
+            result['status'] = status
+    return results
+
+
+def claim_free_tags(count):
+    """
+    Lock up to ``count`` active tags without an active mapping, skipping
+    tags another transaction holds.  Call inside a transaction.
+    """
+    claimed, skipped = [], set()
+    while len(claimed) < count:
+        batch = list(
+            RFID.objects.select_for_update(skip_locked=True)
+            .filter(status='active')
+            .exclude(jewellery_maps__status='active')
+            .exclude(pk__in=skipped)
+            .order_by('pk')[:count - len(claimed)]
+        )
+        if not batch:
+            break
+        # The filter above ran on a snapshot taken before the locks; a tag
+        # mapped and committed meanwhile is only visible to a new query
+        taken = _active_maps([rfid.pk for rfid in batch])
+        for rfid in batch:
+            if rfid.pk in taken:
+                skipped.add(rfid.pk)
+            else:
+                claimed.append(rfid)
+    return claimed
+
+
+def allocate_tags(jewellery_ids, user=None):
+    """
+    Give every listed jewellery item a free tag; returns one result per item.
+    Items that already carry an active tag keep it.
+    """
+    results = [{'index': index, 'jewellery_id': jewellery_id, 'tag': None}
+               for index, jewellery_id in enumerate(jewellery_ids)]
+
+    with transaction.atomic():
+        jewellery = dict(
+            Jewellery.objects
+            .filter(jewellery_id__in=set(jewellery_ids))
+            .values_list('jewellery_id', 'pk')
+        )
+        tagged = dict(
+            RFIDJewelleryMap.objects
+            .filter(jewellery__jewellery_id__in=jewellery.keys(), status='active')
+            .values_list('jewellery__jewellery_id', 'rfid__tag')
+        )
+
+        needing, seen = [], set()
+        for result in results:
+            jewellery_id = result['jewellery_id']
+            if jewellery_id not in jewellery:
+                result.update(status='error', error='Unknown jewellery_id')
+            elif jewellery_id in tagged:
+                result.update(status='exists', tag=tagged[jewellery_id])
+            elif jewellery_id in seen:
+                result.update(status='error', error='Jewellery repeated in this request')
+            else:
+                needing.append(result)
+            seen.add(jewellery_id)
+
+        tags = claim_free_tags(len(needing))
+        for result, rfid in zip(needing, tags):
+            result.update(status='created', tag=rfid.tag)
+        for result in needing[len(tags):]:
+            result.update(status='error', error='No free tag available')
+
+        _save_pairs([(jewellery[result['jewellery_id']], rfid.pk) for result, rfid in zip(needing, tags)], user)
+    return results
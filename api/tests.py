@@ -1,3 +1,624 @@
-from django.test import TestCase
+import asyncio
+import io
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .authentication import user_cache
+from .catalogue_import import CatalogueImporter
+from .dedup import ScanDeduplicator
+from .management.commands.mqtt_subscriber import Command as SubscriberCommand
+from .ingest import AsyncScanBatcher, InvalidScan, ScanBatchWriter, build_scan, clean_tag, save_scans
+from .models import (
+    RFID, Company, Jewellery, Location, Profile, RFIDJewelleryMap, RFIDScan, RFIDScanHourly, Role, Shop,
+)
+from .permissions import PermissionCache, permission_cache
+from .rollups import rollup_chunk, rollup_pending
+from .spool import ScanSpool
+from .tag_cache import tag_cache
+from .views import JewelleryListCreateView
+
+
+class JewelleryCatalogueIndexTests(TestCase):
+    """
+    The catalogue filters of JewelleryListCreateView are served by indexes
+    (checked with EXPLAIN on the query the view builds).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Jewellery.objects.bulk_create([
+            Jewellery(
+                jewellery_id=f'JW-{i:05d}',
+                design_number=f'D{i % 50:03d}',
+                collection_type=['Bridal', 'Daily', 'Festive'][i % 3],
+                metal_type=['Gold', 'Silver', 'Platinum'][i % 3],
+                category=['Ring', 'Necklace', 'Bangle', 'Earring'][i % 4],
+                sub_category=['Band', 'Solitaire', 'Choker'][i % 3],
+                status='active' if i % 5 else 'inactive',
+            )
+            for i in range(500)
+        ])
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # A test-sized table is cheaper to scan; disable that so the plan
+            # shows whether an index can serve the query at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def catalogue_query(self, **params):
+        view = JewelleryListCreateView()
+        view.request = Request(APIRequestFactory().get('/api/jewellery/', params))
+        view.format_kwarg = None
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f'{index_name} not used:\n{plan}')
+
+    def test_unfiltered_page_uses_created_index(self):
+        self.assertUsesIndex(self.catalogue_query()[:50], 'jewellery_created_idx')
+
+    def test_category_filter_uses_category_index(self):
+        queryset = self.catalogue_query(category='Ring', sub_category='Band')
+        self.assertUsesIndex(queryset[:50], 'jewellery_category_idx')
+
+    def test_metal_filter_uses_metal_index(self):
+        self.assertUsesIndex(self.catalogue_query(metal_type='Gold')[:50], 'jewellery_metal_idx')
+
+    def test_collection_filter_uses_collection_index(self):
+        self.assertUsesIndex(self.catalogue_query(collection_type='Bridal')[:50], 'jewellery_collection_idx')
+
+    def test_status_filter_uses_status_index(self):
+        self.assertUsesIndex(self.catalogue_query(status='inactive')[:50], 'jewellery_status_idx')
+
+    def test_filters_return_matching_rows(self):
+        rows = list(self.catalogue_query(category='Ring', metal_type='Gold', q='JW-000'))
+        self.assertTrue(rows)
+        for jewellery in rows:
+            self.assertEqual((jewellery.category, jewellery.metal_type), ('Ring', 'Gold'))
+            self.assertTrue(jewellery.jewellery_id.startswith('JW-000'))
+
+    @skipUnless(connection.vendor == 'postgresql', 'LIKE prefix indexes need varchar_pattern_ops')
+    def test_design_number_prefix_uses_pattern_index(self):
+        queryset = Jewellery.objects.filter(design_number__startswith='D01')
+        self.assertUsesIndex(queryset, 'jewellery_design_idx')
+
+
+class RolePermissionTests(TestCase):
+    """
+    User and role management is gated on the flags of the user's role.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='Acme')
+        location = Location.objects.create(name='Main', company=company)
+        shop = Shop.objects.create(name='Front', location=location)
+        org = {'company': company, 'location': location, 'shop': shop}
+        cls.viewer = Role.objects.create(name='Viewer', role_view=True, user_view=True, **org)
+        cls.admin = Role.objects.create(
+            name='Admin', role_view=True, role_create=True, user_view=True, user_edit=True, **org)
+        cls.no_role = cls.make_user('norole', None)
+        cls.viewing = cls.make_user('viewing', cls.viewer)
+        cls.managing = cls.make_user('managing', cls.admin)
+
+    @staticmethod
+    def make_user(username, role):
+        user = User.objects.create_user(username, f'{username}@example.com', 'secret')
+        Profile.objects.create(user=user, role=role)
+        return user
+
+    def setUp(self):
+        # Both caches outlive each test's transaction
+        permission_cache.clear()
+        user_cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_user_without_role_is_refused(self):
+        client = self.client_for(self.no_role)
+        self.assertEqual(client.get(reverse('user-list')).status_code, 403)
+        self.assertEqual(client.get(reverse('role-list')).status_code, 403)
+
+    def test_flags_gate_each_method(self):
+        client = self.client_for(self.viewing)
+        self.assertEqual(client.get(reverse('role-list')).status_code, 200)
+        self.assertEqual(client.get(reverse('user-list')).status_code, 200)
+        response = client.post(reverse('role-list'), {'name': 'New'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_superuser_is_always_allowed(self):
+        superuser = User.objects.create_superuser('root', 'root@example.com', 'secret')
+        self.assertEqual(self.client_for(superuser).get(reverse('role-list')).status_code, 200)
+
+    def test_role_change_applies_immediately(self):
+        client = self.client_for(self.no_role)
+        self.assertEqual(client.get(reverse('role-list')).status_code, 403)
+        profile = self.no_role.profile
+        profile.role = self.viewer
+        profile.save()
+        self.assertEqual(client.get(reverse('role-list')).status_code, 200)
+        self.viewer.role_view = False
+        self.viewer.save()
+        self.assertEqual(client.get(reverse('role-list')).status_code, 403)
+
+    def test_cached_decision_needs_no_queries(self):
+        client = self.client_for(self.viewing)
+        client.get(reverse('user-list'))
+        with self.assertNumQueries(0):
+            response = client.post(reverse('role-list'), {'name': 'New'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_masks_are_shared_between_processes(self):
+        # Each worker process has its own PermissionCache over the same cache
+        worker_a, worker_b = PermissionCache(), PermissionCache()
+        worker_a.store(self.viewing.pk, 5, self.viewer.pk)
+        self.assertEqual(worker_b.get(self.viewing.pk), 5)
+        worker_b.forget_role(self.viewer.pk)
+        self.assertIsNone(worker_a.get(self.viewing.pk))
+        worker_a.store(self.no_role.pk, 0, None)
+        worker_b.forget(self.no_role.pk)
+        self.assertIsNone(worker_a.get(self.no_role.pk))
+
+    def test_user_cannot_change_own_role(self):
+        url = reverse('profile-update', args=[self.managing.pk])
+        response = self.client_for(self.managing).patch(url, {'role': self.viewer.pk})
+        self.assertEqual(response.status_code, 403)
+        self.managing.profile.refresh_from_db()
+        self.assertEqual(self.managing.profile.role, self.admin)
+
+    def test_user_cannot_change_own_role_through_user_detail(self):
+        client = self.client_for(self.managing)
+        url = reverse('user-detail', args=[self.managing.pk])
+        response = client.patch(url, {'profile': {'role': self.viewer.pk}}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.managing.profile.refresh_from_db()
+        self.assertEqual(self.managing.profile.role, self.admin)
+        response = client.patch(url, {'profile': {'role': self.admin.pk}, 'email': 'm@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = client.patch(
+            reverse('user-detail', args=[self.no_role.pk]), {'profile': {'role': self.viewer.pk}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.no_role.profile.refresh_from_db()
+        self.assertEqual(self.no_role.profile.role, self.viewer)
+
+    def test_role_assignment_needs_user_edit(self):
+        url = reverse('profile-update', args=[self.no_role.pk])
+        response = self.client_for(self.viewing).patch(url, {'role': self.admin.pk})
+        self.assertEqual(response.status_code, 403)
+        response = self.client_for(self.managing).patch(url, {'role': self.viewer.pk})
+        self.assertEqual(response.status_code, 200)
+        self.no_role.profile.refresh_from_db()
+        self.assertEqual(self.no_role.profile.role, self.viewer)
+
+    def test_own_profile_fields_stay_editable(self):
+        url = reverse('profile-update', args=[self.no_role.pk])
+        response = self.client_for(self.no_role).patch(url, {'phone': '555-0100'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client_for(self.no_role).patch(
+            reverse('profile-update', args=[self.viewing.pk]), {'phone': '555-0101'})
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(MQTT_WEBHOOK_SECRET='secret')
+class ScanValidationTests(TestCase):
+    """
+    Payloads that cannot be stored as a tag are refused at the webhook.
+    """
+
+    def setUp(self):
+        tag_cache.clear()
+
+    def post(self, payload):
+        return self.client.post(
+            reverse('mqtt-webhook'), {'payload': payload, 'clientid': 'reader-1'},
+            content_type='application/json', headers={'X-Webhook-Token': 'secret'},
+        )
+
+    def test_clean_tag(self):
+        self.assertEqual(clean_tag('TAG-1'), 'TAG-1')
+        self.assertEqual(clean_tag(12345), '12345')
+        for value in ['', None, {'tag': 'x'}, ['x'], True, 'T' * 101, 'T1\x00', 'T1\n']:
+            with self.subTest(value=value), self.assertRaises(InvalidScan):
+                clean_tag(value)
+
+    def test_invalid_payloads_are_refused(self):
+        for payload in ['T' * 300, {'tag': 'x'}, 'T1\x00']:
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+        self.assertFalse(RFIDScan.objects.exists())
+
+    def test_valid_payload_is_stored(self):
+        self.assertEqual(self.post('TAG-1').status_code, 200)
+        self.assertEqual(RFIDScan.objects.get().rfid_tag, 'TAG-1')
+
+
+class StaleTagCacheTests(TransactionTestCase):
+    """
+    A tag whose RFID row another process deleted is still recorded.
+    Foreign keys may only be checked at commit, hence TransactionTestCase.
+    """
+
+    def setUp(self):
+        tag_cache.clear()
+
+    def test_deleted_rfid_is_re_resolved(self):
+        rfid = RFID.objects.create(tag='TAG-1')
+        self.assertEqual(tag_cache.resolve('TAG-1'), rfid.pk)
+        with connection.cursor() as cursor:
+            # Raw SQL, so no signal tells this process's cache
+            cursor.execute(f'DELETE FROM {RFID._meta.db_table} WHERE id = %s', [rfid.pk])
+
+        save_scans([build_scan('TAG-1', reader_id='reader-1')])
+
+        scan = RFIDScan.objects.get()
+        self.assertEqual(scan.rfid_tag, 'TAG-1')
+        self.assertIsNone(scan.rfid_id)
+        self.assertIsNone(tag_cache.resolve('TAG-1'))
+
+
+@override_settings(MQTT_WEBHOOK_SECRET='secret')
+class BulkWebhookTests(TestCase):
+    """
+    The bulk webhook stores valid envelopes and reports a result per item.
+    """
+
+    def setUp(self):
+        tag_cache.clear()
+
+    def post(self, body, content_type='application/json'):
+        return self.client.post(
+            reverse('mqtt-webhook-bulk'), body,
+            content_type=content_type, headers={'X-Webhook-Token': 'secret'},
+        )
+
+    def test_json_array_results_per_item(self):
+        messages = [
+            {'payload': 'BULK-1', 'clientid': 'bulk-reader'},
+            {'payload': 'BULK-1', 'clientid': 'bulk-reader'},
+            {'payload': 'T' * 300, 'clientid': 'bulk-reader'},
+            {'payload': {'tag': 'x'}},
+            {'clientid': 'bulk-reader'},
+            'not an envelope',
+        ]
+        response = self.post(messages)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            ['accepted', 'merged', 'rejected', 'rejected', 'rejected', 'rejected'],
+        )
+        self.assertEqual((body['accepted'], body['merged'], body['rejected']), (1, 1, 4))
+        self.assertEqual(body['results'][2]['error'], 'Tag longer than 100 characters')
+        scan = RFIDScan.objects.get()
+        self.assertEqual((scan.rfid_tag, scan.hit_count), ('BULK-1', 2))
+
+    def test_ndjson_rejects_bad_lines(self):
+        body = '{"payload": "BULK-2", "clientid": "ndjson-reader"}\nnot json\n{"payload": "BULK-3", "clientid": "ndjson-reader"}\n'
+        response = self.post(body, content_type='application/x-ndjson')
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['accepted', 'rejected', 'accepted'])
+        self.assertEqual(results[1]['error'], 'Invalid JSON')
+        self.assertEqual(set(RFIDScan.objects.values_list('rfid_tag', flat=True)), {'BULK-2', 'BULK-3'})
+
+    @override_settings(MQTT_WEBHOOK_MAX_BATCH=2)
+    def test_oversized_batch_is_refused(self):
+        response = self.post([{'payload': f'BULK-{i}'} for i in range(3)])
+        self.assertEqual(response.status_code, 413)
+
+
+class AsyncScanBatcherTests(TestCase):
+    """
+    Concurrent submissions share a write; a refused row fails only its own.
+    """
+
+    def setUp(self):
+        tag_cache.clear()
+
+    async def test_refused_row_fails_only_its_request(self):
+        batcher = AsyncScanBatcher(batch_size=10, flush_interval=0.01)
+        scans = [build_scan(f'ASYNC-{i}', reader_id='async-reader') for i in range(5)]
+        scans[2].hit_count = -1  # violates the column's check constraint
+
+        results = await asyncio.gather(*(batcher.submit(scan) for scan in scans), return_exceptions=True)
+
+        self.assertEqual([isinstance(result, Exception) for result in results], [False, False, True, False, False])
+        stored = [tag async for tag in RFIDScan.objects.values_list('rfid_tag', flat=True)]
+        self.assertEqual(sorted(stored), ['ASYNC-0', 'ASYNC-1', 'ASYNC-3', 'ASYNC-4'])
+
+
+class SubscriberStartupTests(SimpleTestCase):
+    """
+    The subscriber starts while the database is down and relies on the spool.
+    """
+
+    def test_starts_without_database(self):
+        stdout = io.StringIO()
+        command = SubscriberCommand(stdout=stdout)
+        with tempfile.TemporaryDirectory() as spool_dir:
+            options = vars(command.create_parser('manage.py', 'mqtt_subscriber').parse_args(
+                ['--spool-path', f'{spool_dir}/scans.spool', '--stats-interval', '0']))
+            with mock.patch.object(tag_cache, 'warm', side_effect=OperationalError('database is down')), \
+                    mock.patch('api.management.commands.mqtt_subscriber.mqtt.Client') as client:
+                client.return_value.connect.side_effect = KeyboardInterrupt
+                self.assertTrue(command.run_subscriber(options))
+        self.assertIn('tag cache not warmed', stdout.getvalue())
+
+
+class ScanDeduplicatorTests(SimpleTestCase):
+    """
+    Repeat reads are merged for a fixed window from the first read.
+    """
+
+    def scan(self, tag='TAG-1', reader='reader-1'):
+        return build_scan(tag, reader_id=reader)
+
+    def collapse(self, dedup, at, *scans):
+        with mock.patch('api.dedup.time.monotonic', return_value=at):
+            return dedup.collapse(scans)
+
+    def test_repeats_merge_into_first_read(self):
+        dedup = ScanDeduplicator(window=2)
+        first, repeat, other_reader = self.scan(), self.scan(), self.scan(reader='reader-2')
+        fresh = self.collapse(dedup, 100, first, repeat, other_reader)
+        self.assertEqual(fresh, [first, other_reader])
+        self.assertEqual(first.hit_count, 2)
+        self.assertEqual(first.last_seen, repeat.last_seen)
+
+    def test_window_is_not_extended_by_repeats(self):
+        dedup = ScanDeduplicator(window=2)
+        first = self.scan()
+        self.collapse(dedup, 100, first)
+        self.assertEqual(self.collapse(dedup, 101.5, self.scan()), [])
+        later = self.scan()
+        self.assertEqual(self.collapse(dedup, 102.5, later), [later])
+        self.assertEqual(first.hit_count, 2)
+
+    def test_merges_into_saved_rows_are_dirty(self):
+        dedup = ScanDeduplicator(window=2)
+        first = self.scan()
+        self.collapse(dedup, 100, first)
+        first.pk = 1
+        self.assertEqual(dedup.pop_dirty(), [])
+        self.collapse(dedup, 100.5, self.scan())
+        self.assertEqual(dedup.pop_dirty(), [first])
+
+    def test_zero_window_disables_merging(self):
+        scans = [self.scan(), self.scan()]
+        self.assertEqual(self.collapse(ScanDeduplicator(window=0), 100, *scans), scans)
+
+
+class ScanSpoolTests(TestCase):
+    """
+    Spooled scans are replayed in order, once, past rows the database refuses.
+    """
+
+    def setUp(self):
+        tag_cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.spool = ScanSpool(f'{directory.name}/scans.spool')
+
+    def spooled(self, *tags):
+        scans = [build_scan(tag, reader_id='spool-reader') for tag in tags]
+        self.spool.append(scans)
+        return scans
+
+    def stored_tags(self):
+        return list(RFIDScan.objects.order_by('id').values_list('rfid_tag', flat=True))
+
+    def test_interrupted_replay_resumes_without_duplicates(self):
+        self.spooled('SPOOL-1', 'SPOOL-2', 'SPOOL-3', 'SPOOL-4')
+        batches = []
+
+        def write(scans):
+            if len(batches) == 1:
+                raise OperationalError('database went away')
+            batches.append(scans)
+            save_scans(scans)
+
+        with self.assertRaises(OperationalError):
+            self.spool.replay(write, batch_size=2)
+        self.assertTrue(self.spool.pending())
+        self.assertEqual(self.spool.replay(save_scans, batch_size=2), (2, True))
+        self.assertEqual(self.stored_tags(), ['SPOOL-1', 'SPOOL-2', 'SPOOL-3', 'SPOOL-4'])
+        self.assertFalse(self.spool.pending())
+
+    def test_refused_row_is_quarantined(self):
+        scans = self.spooled('SPOOL-1', 'SPOOL-2', 'SPOOL-3')
+        scans[1].hit_count = -1  # violates the column's check constraint
+        self.spool.path.unlink()
+        self.spool.append(scans)
+        writer = ScanBatchWriter(stats_interval=0, spool=self.spool)
+
+        writer.replay_spool()
+
+        self.assertEqual(self.stored_tags(), ['SPOOL-1', 'SPOOL-3'])
+        self.assertFalse(self.spool.pending())
+        self.assertEqual((writer.stats.replayed, writer.stats.failed), (2, 1))
+        rejected = self.spool.rejected_path.read_text().splitlines()
+        self.assertEqual([ScanSpool.decode(line).rfid_tag for line in rejected], ['SPOOL-2'])
+
+        # The writer carries on with new scans
+        writer.flush([build_scan('SPOOL-4', reader_id='spool-reader')])
+        self.assertEqual(self.stored_tags()[-1], 'SPOOL-4')
+
+
+@override_settings(RFID_SCAN_ROLLUP_LAG=60)
+class HourlyRollupTests(TestCase):
+    """
+    Scans are folded once, after the horizon a run recorded has settled.
+    """
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.hour = self.now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+    def scan(self, tag='ROLL-1', **fields):
+        fields.setdefault('created_at', self.hour + timedelta(minutes=5))
+        return RFIDScan.objects.create(rfid_tag=tag, reader_id='roll-reader', **fields)
+
+    def run_at(self, seconds, **kwargs):
+        with mock.patch('api.rollups.timezone.now', return_value=self.now + timedelta(seconds=seconds)):
+            return rollup_pending(**kwargs)
+
+    def totals(self):
+        return {
+            bucket.rfid_tag: (bucket.scan_count, bucket.hit_count)
+            for bucket in RFIDScanHourly.objects.filter(hour=self.hour)
+        }
+
+    def test_scans_wait_for_the_lag(self):
+        self.scan(hit_count=3)
+        self.scan(hit_count=2)
+        self.assertEqual(self.run_at(0), 0)  # records the horizon
+        self.assertEqual(self.run_at(59), 0)
+        self.assertEqual(self.run_at(61), 2)
+        self.assertEqual(self.totals(), {'ROLL-1': (2, 5)})
+
+        # The horizon taken once caught up at 61 predates this scan, so it
+        # waits for the next one: up to two lags.
+        self.scan(hit_count=4)
+        self.assertEqual(self.run_at(62), 0)
+        self.assertEqual(self.run_at(122), 0)
+        self.assertEqual(self.run_at(183), 1)
+        self.assertEqual(self.totals(), {'ROLL-1': (3, 9)})
+
+    def test_lower_id_committed_late_is_folded(self):
+        self.scan(id=10)
+        self.assertEqual(self.run_at(0), 0)
+        # An old-looking row (e.g. spool replay) whose lower id commits after 10
+        self.scan(id=5, tag='ROLL-2')
+        self.assertEqual(self.run_at(61), 2)
+        self.assertEqual(self.totals(), {'ROLL-1': (1, 1), 'ROLL-2': (1, 1)})
+
+    def test_lag_never_drops_below_the_dedup_window(self):
+        self.scan()
+        self.assertEqual(self.run_at(0, lag=0), 0)
+        self.assertEqual(self.run_at(1, lag=0), 0)
+        self.assertEqual(self.run_at(10, lag=0), 1)
+
+    def test_chunks_fold_each_scan_once(self):
+        for _ in range(5):
+            self.scan()
+        self.run_at(0)
+        with mock.patch('api.rollups.timezone.now', return_value=self.now + timedelta(seconds=61)):
+            self.assertEqual([rollup_chunk(chunk_size=2) for _ in range(4)], [2, 2, 1, 0])
+        self.assertEqual(self.totals(), {'ROLL-1': (5, 5)})
+
+
+class ReconciliationTests(TestCase):
+    """
+    Stock-take sweeps are checked against the active tag mappings.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('stocktake', 'stocktake@example.com', 'secret')
+        for tag in ('REC-1', 'REC-2', 'REC-3', 'REC-4', 'REC-5'):
+            RFID.objects.create(tag=tag)
+        for jewellery_id, tags in (('J-1', ['REC-1']), ('J-2', ['REC-2']), ('J-3', ['REC-3']), ('J-4', ['REC-3', 'REC-5'])):
+            piece = Jewellery.objects.create(
+                jewellery_id=jewellery_id, design_number='D1', collection_type='C',
+                metal_type='gold', category='ring', sub_category='band',
+            )
+            for tag in tags:
+                RFIDJewelleryMap.objects.create(jewellery=piece, rfid=RFID.objects.get(tag=tag))
+        second = Jewellery.objects.create(
+            jewellery_id='J-5', design_number='D1', collection_type='C',
+            metal_type='gold', category='ring', sub_category='band',
+        )
+        RFIDJewelleryMap.objects.create(jewellery=second, rfid=RFID.objects.get(tag='REC-5'))
+
+    def post(self, body):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post(reverse('reconciliation'), body, format='json')
+
+    def test_sweep_results(self):
+        response = self.post({'tags': ['REC-1', 'REC-3', 'REC-4', 'NOPE']})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['present'], {'REC-1': 'J-1'})
+        self.assertEqual(body['unmapped'], ['REC-4'])
+        self.assertEqual(body['unknown'], ['NOPE'])
+        self.assertEqual(body['missing'], {'REC-2': 'J-2'})
+
+    def test_several_active_mappings_are_conflicts(self):
+        body = self.post({'tags': ['REC-3']}).json()
+        self.assertEqual(body['conflicts'], {'REC-3': ['J-3', 'J-4'], 'REC-5': ['J-4', 'J-5']})
+        self.assertNotIn('REC-3', body['present'])
+        self.assertNotIn('REC-5', body['missing'])
+        self.assertEqual(body['counts']['conflicts'], 2)
+
+    def test_window_filters_must_be_scalars(self):
+        for body in ({'since': '2026-01-01T00:00:00', 'reader': ['r1', 'r2']},
+                     {'since': '2026-01-01T00:00:00', 'reader': {'id': 'r1'}},
+                     {'since': '2026-01-01T00:00:00', 'shop': [1]}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+
+
+@override_settings(IMPORT_CHUNK_SIZE=2)
+class CatalogueImportTests(TestCase):
+    """
+    Rows an import does not save are reported, never dropped silently.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer', 'importer@example.com', 'secret')
+
+    def setUp(self):
+        tag_cache.clear()
+
+    def upload(self, lines, kind='rfid'):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        upload = SimpleUploadedFile('rows.ndjson', '\n'.join(lines).encode(), 'application/x-ndjson')
+        return client.post(reverse('catalogue-import', args=[kind]), {'file': upload}, format='multipart')
+
+    def test_duplicate_keys_in_a_chunk_are_superseded(self):
+        response = self.upload([
+            '{"tag": "IMP-1", "status": "active"}',
+            '{"tag": "IMP-1", "status": "inactive"}',
+            '{"tag": "IMP-2"}',
+        ])
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual((body['imported'], body['failed'], body['superseded']), (2, 0, 1))
+        self.assertEqual(body['superseded_rows'], [{'line': 1, 'by': 2}])
+        self.assertEqual(RFID.objects.get(tag='IMP-1').status, 'inactive')
+
+    def test_refused_chunk_is_reported_and_import_continues(self):
+        save_rfid = CatalogueImporter.save_rfid
+        calls = []
+
+        def refuse_first(importer, objects):
+            calls.append(len(objects))
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            save_rfid(importer, objects)
+
+        with mock.patch.object(CatalogueImporter, 'save_rfid', refuse_first):
+            response = self.upload(['{"tag": "IMP-1"}', '{"tag": "IMP-2"}', '{"tag": "IMP-3"}'])
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual((body['imported'], body['failed']), (1, 2))
+        self.assertEqual([error['line'] for error in body['errors']], [1, 2])
+        self.assertIn('database is locked', body['errors'][0]['errors']['row'][0])
+        self.assertEqual(list(RFID.objects.values_list('tag', flat=True)), ['IMP-3'])
@@ -15,6 +15,8 @@ urlpatterns = [
     path('dashboard/active-authors/', ActiveAuthorsView.as_view(), name='active-authors'),
     path('dashboard/new-designations/', NewDesignationsView.as_view(), name='new-designations'),
     path('dashboard/user-activity/', UserActivityView.as_view(), name='user-activity'),
+    path('dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
+    path('dashboard/cache-stats/', DashboardCacheStatsView.as_view(), name='dashboard-cache-stats'),
 
     # Users
     path('users/', UserListCreateView.as_view(), name='user-list'),
@@ -35,6 +37,7 @@ urlpatterns = [
     # Shops
     path('shops/', ShopListCreate.as_view(), name='shop-list'),
     path('shops/<int:pk>/', ShopRetrieveUpdateDestroy.as_view(), name='shop-detail'),
+    path('org-tree/', OrgTreeView.as_view(), name='org-tree'),
 
     path('profiles/<int:user_id>/', ProfileUpdateView.as_view(), name='profile-update'),
 
@@ -45,10 +48,20 @@ urlpatterns = [
     path('rfid/<int:pk>/', RFIDDetailView.as_view(), name='rfid-detail'),
     path('rfid-jewellery-map/', RFIDJewelleryMapListCreateView.as_view(), name='rfid-jewellery-map-list'),
     path('rfid-jewellery-map/<int:pk>/', RFIDJewelleryMapDetailView.as_view(), name='rfid-jewellery-map-detail'),
+    path('rfid-jewellery-map/bulk/', RFIDJewelleryMapBulkView.as_view(), name='rfid-jewellery-map-bulk'),
+    path('catalogue/import/<str:kind>/', CatalogueImportView.as_view(), name='catalogue-import'),
+
+    # Stock take
+    path('reconciliation/', ReconciliationView.as_view(), name='reconciliation'),
 
         # MQTT webhook (public, no authentication)
     path('mqtt-webhook/', mqtt_webhook, name='mqtt-webhook'),
+    path('mqtt-webhook/bulk/', mqtt_webhook_bulk, name='mqtt-webhook-bulk'),
+    path('mqtt-webhook/async/', mqtt_webhook_async, name='mqtt-webhook-async'),
 
     # list scans (authenticated)
     path('rfid-scans/', RFIDScanListView.as_view(), name='rfid-scan-list'),
+    path('rfid-scans/hourly/', RFIDScanHourlyView.as_view(), name='rfid-scan-hourly'),
+    path('rfid-scans/stream/', rfid_scan_stream, name='rfid-scan-stream'),
+    path('rfid-scans/export/', RFIDScanExportView.as_view(), name='rfid-scan-export'),
 ]
\ No newline at end of file
@@ -1,32 +1,51 @@
-from rest_framework import generics, permissions, status
+from rest_framework import filters, generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .models import (
-    TrafficSource, NewUser, SalesDistribution, Project,
-    ActiveAuthor, UserActivity, Location, Company, Shop, Role,
-    Designation, Profile, Jewellery, RFID, RFIDJewelleryMap
+    Location, Company, Shop, Role,
+    Profile, Jewellery, RFID, RFIDJewelleryMap
 )
 from .serializers import (
     UserSerializer, RegisterSerializer,
-    TrafficSourceSerializer, NewUserSerializer,
-    SalesDistributionSerializer, ProjectSerializer,
-    ActiveAuthorSerializer, UserActivitySerializer,
     LocationSerializer, CompanySerializer, ShopSerializer,
-    RoleSerializer, DesignationSerializer, ProfileSerializer, 
-    JewellerySerializer, RFIDSerializer, RFIDJewelleryMapSerializer, RFIDScanSerializer
+    RoleSerializer, ProfileSerializer,
+    JewellerySerializer, RFIDSerializer, RFIDJewelleryMapSerializer, RFIDScanSerializer,
+    UserListSerializer,
 )
 
 import json
 import hmac
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from .models import RFID, RFIDScan
+from django.views.decorators.http import require_GET, require_POST
+from .models import RFID, RFIDScan, RFIDScanHourly
+from .ingest import InvalidScan, get_async_batcher, scan_dedup, scan_from_envelope, write_scans
+from datetime import timedelta, timezone as dt_timezone
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from .pagination import ScanCursorPagination, StandardPagination
+from . import dashboard, org_tree
+from .mixins import ConditionalListMixin
+from .reconcile import reconcile_tags, tags_from_scans
+from .tagging import allocate_tags, map_pairs
+from .export import FORMATS as EXPORT_FORMATS, export_rows, gzip_stream, iterate_async
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework.negotiation import DefaultContentNegotiation
+from .catalogue_import import CatalogueImporter, ImportFormatError, detect_format, iter_rows
+from rest_framework.parsers import MultiPartParser
+from .stream import ScanSubscriber, get_scan_hub, readers_for_shop, scan_event_stream
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from .authentication import CachedJWTAuthentication
+from .permissions import HasRolePermission, has_role_permission
+from rest_framework_simplejwt.exceptions import InvalidToken
 
 
 # Authentication
@@ -56,84 +75,141 @@ class TotalUsersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        total = User.objects.count()
-        growth = 12.5
-        return Response({'total': total, 'growth': growth})
+        return Response(dashboard.get_widget('total_users'))
 
 class TrafficSourcesView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        sources = TrafficSource.objects.all()
-        serializer = TrafficSourceSerializer(sources, many=True)
-        return Response(serializer.data)
+        return Response(dashboard.get_widget('traffic_sources'))
 
 class NewUsersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        users = NewUser.objects.order_by('-time_added')[:4]
-        serializer = NewUserSerializer(users, many=True)
-        return Response(serializer.data)
+        return Response(dashboard.get_widget('new_users'))
 
 class SalesDistributionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        sales = SalesDistribution.objects.all()
-        serializer = SalesDistributionSerializer(sales, many=True)
-        return Response(serializer.data)
+        return Response(dashboard.get_widget('sales_distribution'))
 
 class ProjectProgressView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        project = Project.objects.first()
-        if not project:
-            return Response({})
-        serializer = ProjectSerializer(project)
-        return Response(serializer.data)
+        return Response(dashboard.get_widget('project_progress'))
 
 class ActiveAuthorsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        authors = ActiveAuthor.objects.all()
-        serializer = ActiveAuthorSerializer(authors, many=True)
-        return Response(serializer.data)
+        return Response(dashboard.get_widget('active_authors'))
 
 class NewDesignationsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        designations = Designation.objects.order_by('-date')[:4]
-        serializer = DesignationSerializer(designations, many=True)
-        return Response(serializer.data)
+        return Response(dashboard.get_widget('new_designations'))
 
 class UserActivityView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        activities = UserActivity.objects.all()
-        serializer = UserActivitySerializer(activities, many=True)
-        return Response(serializer.data)
+        return Response(dashboard.get_widget('user_activity'))
+
+class DashboardSummaryView(APIView):
+    """
+    Every dashboard widget in one response, so the dashboard loads with a
+    single request.  ``?widgets=total_users,user_activity`` limits it to
+    the listed widgets.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        requested = request.query_params.get('widgets', '')
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in dashboard.WIDGETS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown widgets: {', '.join(unknown)}", 'available': list(dashboard.WIDGETS)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(dashboard.build_summary(names))
+
+class DashboardCacheStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(dashboard.cache_stats())
 
 # Users
 class UserListCreateView(generics.ListCreateAPIView):
-    queryset = User.objects.all()
+    """
+    GET pages through users with a read-only serializer and a single
+    joined query; ``?search=`` matches username, email or shop.
+    POST still goes through the writable UserSerializer.
+    """
     serializer_class = UserSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasRolePermission]
+    permission_resource = 'user'
+    pagination_class = StandardPagination
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['username', 'email', 'profile__shop']
+
+    def get_queryset(self):
+        if self.request.method != 'GET':
+            return User.objects.all()
+        role_users = (
+            Profile.objects.filter(role=OuterRef('profile__role'))
+            .order_by()
+            .values('role')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return (
+            User.objects
+            .select_related(
+                'profile__role__company',
+                'profile__role__location',
+                'profile__role__shop',
+            )
+            .annotate(role_users_count=Subquery(role_users))
+            .order_by('id')
+        )
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return UserListSerializer
+        return UserSerializer
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Editing a user needs ``user_edit``; as in ProfileUpdateView, nobody but
+    a superuser can change their own role through the nested profile.
+    """
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasRolePermission]
+    permission_resource = 'user'
+
+    def perform_update(self, serializer):
+        user = self.request.user
+        profile_data = serializer.validated_data.get('profile') or {}
+        if 'role' in profile_data and serializer.instance.pk == user.pk and not user.is_superuser:
+            role = profile_data['role']
+            current = Profile.objects.filter(user_id=user.pk).values_list('role_id', flat=True).first()
+            if (role.pk if role is not None else None) != current:
+                raise PermissionDenied('You cannot change your own role.')
+        serializer.save()
 
 # Roles
 class RoleListCreate(generics.ListCreateAPIView):
-    queryset = Role.objects.all()
+    queryset = Role.objects.select_related('company', 'location', 'shop').annotate(users_count=Count('profiles'))
     serializer_class = RoleSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasRolePermission]
+    permission_resource = 'role'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -143,24 +219,25 @@ class RoleListCreate(generics.ListCreateAPIView):
         return queryset
 
 class RoleRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Role.objects.all()
+    queryset = Role.objects.select_related('company', 'location', 'shop').annotate(users_count=Count('profiles'))
     serializer_class = RoleSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, HasRolePermission]
+    permission_resource = 'role'
 
 # Companies
 class CompanyListCreate(generics.ListCreateAPIView):
-    queryset = Company.objects.all()
+    queryset = Company.objects.annotate(locations_count=Count('locations'))
     serializer_class = CompanySerializer
     permission_classes = [permissions.IsAuthenticated]
 
 class CompanyRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Company.objects.all()
+    queryset = Company.objects.annotate(locations_count=Count('locations'))
     serializer_class = CompanySerializer
     permission_classes = [permissions.IsAuthenticated]
 
 # Locations
 class LocationListCreate(generics.ListCreateAPIView):
-    queryset = Location.objects.all()
+    queryset = Location.objects.select_related('company').annotate(shops_count=Count('shops'))
     serializer_class = LocationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -172,13 +249,13 @@ class LocationListCreate(generics.ListCreateAPIView):
         return queryset
 
 class LocationRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Location.objects.all()
+    queryset = Location.objects.select_related('company').annotate(shops_count=Count('shops'))
     serializer_class = LocationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 # Shops
 class ShopListCreate(generics.ListCreateAPIView):
-    queryset = Shop.objects.all()
+    queryset = Shop.objects.select_related('location__company')
     serializer_class = ShopSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -190,15 +267,30 @@ class ShopListCreate(generics.ListCreateAPIView):
         return queryset
 
 class ShopRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Shop.objects.all()
+    queryset = Shop.objects.select_related('location__company')
     serializer_class = ShopSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+class OrgTreeView(APIView):
+    """
+    The whole Company -> Location -> Shop hierarchy with location, shop,
+    role and user counts, built from a fixed number of queries and cached.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(org_tree.get_org_tree())
+
 from rest_framework import generics, permissions
 from .models import Profile
 from .serializers import ProfileSerializer
 
 class ProfileUpdateView(generics.UpdateAPIView):
+    """
+    Users may edit their own profile except its role; changing a role or
+    another user's profile needs the ``user_edit`` permission, and nobody
+    but a superuser can change their own role.
+    """
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -207,13 +299,53 @@ class ProfileUpdateView(generics.UpdateAPIView):
         # Return the profile for the user specified in the URL
         user_id = self.kwargs['user_id']
         return Profile.objects.get(user_id=user_id)
+
+    def perform_update(self, serializer):
+        user = self.request.user
+        profile = serializer.instance
+        own_profile = profile.user_id == user.pk
+        role_changed = 'role' in serializer.validated_data and serializer.validated_data['role'] != profile.role
+        if role_changed and own_profile and not user.is_superuser:
+            raise PermissionDenied('You cannot change your own role.')
+        if (role_changed or not own_profile) and not has_role_permission(user, 'user_edit'):
+            raise PermissionDenied('You do not have permission to edit this profile.')
+        serializer.save()
     
 
 # Jewellery views
-class JewelleryListCreateView(generics.ListCreateAPIView):
-    queryset = Jewellery.objects.all()
+class JewelleryListCreateView(ConditionalListMixin, generics.ListCreateAPIView):
+    """
+    Paginated catalogue, newest first.  Exact filters: ``category``,
+    ``sub_category``, ``metal_type``, ``collection_type``, ``status`` and
+    ``design_number``; ``since``/``until`` bound created_at and ``q`` is a
+    prefix search on jewellery_id or design_number.  The common filters
+    are backed by the composite indexes on Jewellery.
+    """
+    queryset = Jewellery.objects.select_related('added_by')
     serializer_class = JewellerySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardPagination
+    filter_fields = ['category', 'sub_category', 'metal_type', 'collection_type', 'status', 'design_number']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        for field in self.filter_fields:
+            value = params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+
+        since = query_datetime(params, 'since')
+        if since:
+            queryset = queryset.filter(created_at__gte=since)
+        until = query_datetime(params, 'until')
+        if until:
+            queryset = queryset.filter(created_at__lt=until)
+
+        prefix = params.get('q', '').strip()
+        if prefix:
+            queryset = queryset.filter(Q(jewellery_id__startswith=prefix) | Q(design_number__startswith=prefix))
+        return queryset.order_by('-created_at', '-id')
 
     def perform_create(self, serializer):
         serializer.save(added_by=self.request.user)
@@ -224,8 +356,8 @@ class JewelleryDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 # RFID views
-class RFIDListCreateView(generics.ListCreateAPIView):
-    queryset = RFID.objects.all()
+class RFIDListCreateView(ConditionalListMixin, generics.ListCreateAPIView):
+    queryset = RFID.objects.select_related('added_by')
     serializer_class = RFIDSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -238,8 +370,10 @@ class RFIDDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 # RFID-Jewellery Map views
-class RFIDJewelleryMapListCreateView(generics.ListCreateAPIView):
-    queryset = RFIDJewelleryMap.objects.all()
+class RFIDJewelleryMapListCreateView(ConditionalListMixin, generics.ListCreateAPIView):
+    queryset = RFIDJewelleryMap.objects.select_related('jewellery', 'rfid', 'added_by')
+    # The serializer embeds the jewellery id and the tag
+    validator_fields = ('updated_at', 'jewellery__updated_at', 'rfid__updated_at')
     serializer_class = RFIDJewelleryMapSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -253,16 +387,134 @@ class RFIDJewelleryMapDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 
+class RFIDJewelleryMapBulkView(APIView):
+    """
+    Tag many items in one transaction.  POST either
+    ``{"pairs": [{"jewellery_id": ..., "tag": ...}, ...]}`` or
+    ``{"allocate": [jewellery_id, ...]}`` to hand each item a free active
+    tag.  Responds with a result per pair (see api/tagging.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        data = request.data
+        max_items = getattr(settings, 'BULK_MAP_MAX_ITEMS', 5000)
+        if 'pairs' in data:
+            items = data['pairs']
+            valid = isinstance(items, list) and all(
+                isinstance(item, dict) and isinstance(item.get('jewellery_id'), str) and isinstance(item.get('tag'), str)
+                for item in items
+            )
+            if not valid:
+                return Response({'error': 'pairs must be a list of {jewellery_id, tag} strings'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        elif 'allocate' in data:
+            items = data['allocate']
+            if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                return Response({'error': 'allocate must be a list of jewellery ids'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({'error': 'Send pairs or allocate'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(items) > max_items:
+            return Response({'error': f'At most {max_items} items per request'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        if 'pairs' in data:
+            results = map_pairs(items, user=request.user)
+        else:
+            results = allocate_tags(items, user=request.user)
+        failed = sum(1 for result in results if result['status'] == 'error')
+        return Response(
+            {'results': results, 'failed': failed},
+            status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK,
+        )
+
+# Catalogue import
+class CatalogueImportView(APIView):
+    """
+    Bulk upsert of catalogue rows from an uploaded CSV or NDJSON ``file``.
+    ``kind`` is jewellery, rfid or map; the format comes from the ``format``
+    field or the file extension.  Responds with counts, per-line errors and
+the rows superseded by a later row with the same key (207 when any).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, kind):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the rows as a "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fmt = detect_format(upload.name, request.data.get('format'))
+            importer = CatalogueImporter(kind, user=request.user)
+        except ImportFormatError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload.seek(0)
+        report = importer.run(iter_rows(upload.file, fmt))
+        partial = report['failed'] or report['superseded']
+        return Response(report, status=status.HTTP_207_MULTI_STATUS if partial else status.HTTP_200_OK)
+
+# Stock take
+class ReconciliationView(APIView):
+    """
+    Reconcile a stock-take sweep against the catalogue.
+
+    POST either ``{"tags": [...]}`` straight from the handheld, or a scan
+    window ``{"since": ..., "until": ..., "reader": ..., "shop": ...}`` to
+    take the distinct tags from RFIDScan.  See api/reconcile.py for the
+    result sets.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        data = request.data
+        max_tags = getattr(settings, 'RECONCILE_MAX_TAGS', 50000)
+        if 'tags' in data:
+            tags = data['tags']
+            if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+                return Response({'error': 'tags must be a list of strings'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            since = query_datetime(data, 'since')
+            if since is None:
+                return Response({'error': 'Send tags or a since/until scan window'}, status=status.HTTP_400_BAD_REQUEST)
+            if not isinstance(data.get('reader') or '', str):
+                return Response({'error': 'reader must be a string'}, status=status.HTTP_400_BAD_REQUEST)
+            if isinstance(data.get('shop'), (list, dict, bool)):
+                return Response({'error': 'shop must be a shop id'}, status=status.HTTP_400_BAD_REQUEST)
+            readers = {data['reader']} if data.get('reader') else set()
+            if data.get('shop'):
+                readers |= readers_for_shop(data['shop'])
+                if not readers:
+                    return Response({'error': 'No readers are assigned to this shop'}, status=status.HTTP_400_BAD_REQUEST)
+            tags = tags_from_scans(since, query_datetime(data, 'until'), readers)
+
+        if len(tags) > max_tags:
+            return Response(
+                {'error': f'At most {max_tags} tags per reconciliation'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        result = reconcile_tags(tags)
+        return Response({
+            'scanned': len(set(tags)),
+            'counts': {name: len(values) for name, values in result.items()},
+            'present': result['present'],
+            'inactive': result['inactive'],
+            'unmapped': sorted(result['unmapped']),
+            'unknown': sorted(result['unknown']),
+            'missing': result['missing'],
+            'conflicts': result['conflicts'],
+        })
+
+
 #MQTT
 
-@csrf_exempt
-@require_POST
-def mqtt_webhook(request):
+def _webhook_auth_error(request):
     """
-    Endpoint called by EMQX when a message arrives on /transaction topic.
-    Expects a secret token in the X-Webhook-Token header.
+    Check the X-Webhook-Token header; returns an error response or None.
     """
-    # 1. Verify the secret token
     token = request.headers.get('X-Webhook-Token', '')
     expected_token = getattr(settings, 'MQTT_WEBHOOK_SECRET', None)
     if not expected_token:
@@ -270,45 +522,352 @@ def mqtt_webhook(request):
 
     if not hmac.compare_digest(token, expected_token):
         return JsonResponse({'error': 'Unauthorized'}, status=401)
+    return None
+
 
-    # 2. Parse JSON body
+def _parse_webhook_message(request):
+    """
+    Parse a single EMQX envelope; returns (data, None) or (None, error response).
+    """
     try:
         data = json.loads(request.body)
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        return None, JsonResponse({'error': 'Invalid JSON'}, status=400)
 
-    # 3. Extract the RFID tag from the payload
     # EMQX sends: {"topic": "/transaction", "payload": "TAG-12345", "qos": 1, ...}
     # The actual message from your publisher is in data.get('payload').
-    payload = data.get('payload')
-    if not payload:
-        return JsonResponse({'error': 'No payload'}, status=400)
+    if not isinstance(data, dict) or not data.get('payload'):
+        return None, JsonResponse({'error': 'No payload'}, status=400)
+    return data, None
+
+
+@csrf_exempt
+@require_POST
+def mqtt_webhook(request):
+    """
+    Endpoint called by EMQX when a message arrives on /transaction topic.
+    Expects a secret token in the X-Webhook-Token header.
+    """
+    # 1. Verify the secret token
+    error = _webhook_auth_error(request)
+    if error:
+        return error
 
-    rfid_tag = str(payload)  # assume payload is the tag string
+    # 2. Parse the JSON body
+    data, error = _parse_webhook_message(request)
+    if error:
+        return error
 
-    # 4. Try to find the RFID object (optional)
-    rfid_obj = None
+    # 3. Build the scan: the publisher's payload is the tag string; topic,
+    # qos, clientid and the broker timestamp go to their own columns
     try:
-        rfid_obj = RFID.objects.get(tag=rfid_tag)
-    except RFID.DoesNotExist:
-        # Tag not in our database – still record the scan with just the tag string
-        pass
-
-    # 5. Save the scan
-    RFIDScan.objects.create(
-        rfid_tag=rfid_tag,
-        rfid=rfid_obj,
-        payload=data
-    )
+        scan = scan_from_envelope(data)
+    except InvalidScan as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # 4-5. Resolve the RFID object (optional) through the shared tag cache
+    # and save the scan. Tags not in our database are still recorded with
+    # just the tag string; a repeat of the same tag from the same reader
+    # within the dedup window is merged into the earlier row instead
+    stored = write_scans([scan], dedup=scan_dedup)
 
     # 6. Trigger any business logic here
 
+    return JsonResponse({'status': 'ok', 'merged': not stored})
+
+
+@csrf_exempt
+@require_POST
+async def mqtt_webhook_async(request):
+    """
+    Native async variant of mqtt_webhook for ASGI deployments
+    (see backend/asgi.py).  The scan is handed to the per-event-loop
+    batcher, which stores it together with other in-flight requests; the
+    response is sent once the batch has been committed.
+    """
+    error = _webhook_auth_error(request)
+    if error:
+        return error
+
+    data, error = _parse_webhook_message(request)
+    if error:
+        return error
+
+    try:
+        scan = scan_from_envelope(data)
+    except InvalidScan as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    await get_async_batcher().submit(scan)
     return JsonResponse({'status': 'ok'})
 
+async def _stream_user(request):
+    """
+    Authenticate a stream request from its Bearer header or ``?token=``
+    (EventSource cannot send headers).  Returns the user or None.
+    """
+    header = request.headers.get('Authorization', '')
+    raw_token = header[7:] if header.startswith('Bearer ') else request.GET.get('token')
+    if not raw_token:
+        return None
+    auth = CachedJWTAuthentication()
+    try:
+        validated = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_user)(validated)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+@require_GET
+async def rfid_scan_stream(request):
+    """
+    Server-Sent Events stream of new scans, for ASGI deployments
+    (see backend/asgi.py).
+
+    Filters: ``tag`` and ``reader`` (comma separated) and ``shop``, which
+    selects the readers assigned to it in RFID_READER_SHOPS.  Every scan
+    event carries its id; a reconnecting client sends it back as
+    Last-Event-ID (or ``?last_event_id=``) and first receives what it missed.
+    """
+    if await _stream_user(request) is None:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+
+    tags = [tag for tag in request.GET.get('tag', '').split(',') if tag]
+    readers = {reader for reader in request.GET.get('reader', '').split(',') if reader}
+    shop_id = request.GET.get('shop')
+    if shop_id:
+        shop_readers = readers_for_shop(shop_id)
+        if not shop_readers:
+            return JsonResponse({'error': 'No readers are assigned to this shop'}, status=400)
+        readers = readers & shop_readers if readers else shop_readers
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid Last-Event-ID'}, status=400)
+
+    subscriber = ScanSubscriber(tags=tags, readers=readers)
+    response = StreamingHttpResponse(
+        scan_event_stream(subscriber, get_scan_hub(), last_event_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # let nginx pass events through
+    return response
+
+def _parse_bulk_messages(body):
+    """
+    Split a bulk webhook body into EMQX envelopes.
+
+    A body starting with '[' is a JSON array; anything else is treated as
+    newline-delimited JSON.  NDJSON lines that fail to parse come back as
+    None so they can be rejected individually.
+    """
+    text = body.decode('utf-8').strip()
+    if text.startswith('['):
+        messages = json.loads(text)
+        if not isinstance(messages, list):
+            raise ValueError('Expected a JSON array')
+        return messages
+
+    messages = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            messages.append(json.loads(line))
+        except json.JSONDecodeError:
+            messages.append(None)
+    return messages
+
+
+@csrf_exempt
+@require_POST
+def mqtt_webhook_bulk(request):
+    """
+    Bulk variant of mqtt_webhook for EMQX batching rule actions.
+    Accepts a JSON array or NDJSON of EMQX message envelopes, stores every
+    valid one with a single bulk insert and returns a result per item
+    (accepted, merged into an earlier read, or rejected).
+    """
+    error = _webhook_auth_error(request)
+    if error:
+        return error
+
+    try:
+        messages = _parse_bulk_messages(request.body)
+    except (UnicodeDecodeError, ValueError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    max_batch = getattr(settings, 'MQTT_WEBHOOK_MAX_BATCH', 5000)
+    if len(messages) > max_batch:
+        return JsonResponse({'error': f'Too many messages (max {max_batch})'}, status=413)
+
+    results = []
+    scans = []
+    for index, data in enumerate(messages):
+        if data is None:
+            results.append({'index': index, 'status': 'rejected', 'error': 'Invalid JSON'})
+            continue
+        if not isinstance(data, dict):
+            results.append({'index': index, 'status': 'rejected', 'error': 'Invalid message'})
+            continue
+        try:
+            scan = scan_from_envelope(data)
+        except InvalidScan as e:
+            results.append({'index': index, 'status': 'rejected', 'error': str(e)})
+            continue
+        scans.append(scan)
+        results.append({'index': index, 'status': 'accepted', 'scan': scan})
+
+    stored = {id(scan) for scan in write_scans(scans, dedup=scan_dedup)} if scans else set()
+    for result in results:
+        scan = result.pop('scan', None)
+        if scan is not None and id(scan) not in stored:
+            result['status'] = 'merged'
+
+    return JsonResponse({
+        'status': 'ok',
+        'accepted': len(stored),
+        'merged': len(scans) - len(stored),
+        'rejected': len(messages) - len(scans),
+        'results': results,
+    })
 
 #For React Part
 
+def query_datetime(params, param):
+    """
+    Aware datetime from an ISO 8601 query parameter (naive means UTC),
+    or None when the parameter is absent.
+    """
+    value = params.get(param)
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+    except (TypeError, ValueError):
+        moment = None
+    if moment is None:
+        raise ValidationError({param: 'Expected an ISO 8601 datetime'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def filter_scans(queryset, params):
+    """
+    Apply the scan filters shared by the scan endpoints:
+    ``tag``, ``rfid``, ``reader`` and a ``since``/``until`` created_at range.
+    Every filter is served by one of the RFIDScan composite indexes.
+    """
+    tag = params.get('tag')
+    if tag:
+        queryset = queryset.filter(rfid_tag=tag)
+    rfid_id = params.get('rfid')
+    if rfid_id:
+        queryset = queryset.filter(rfid_id=rfid_id)
+    reader = params.get('reader')
+    if reader:
+        queryset = queryset.filter(reader_id=reader)
+
+    since = query_datetime(params, 'since')
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    until = query_datetime(params, 'until')
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset
+
+
 class RFIDScanListView(generics.ListAPIView):
-    queryset = RFIDScan.objects.all().order_by('-created_at')
+    """
+    Scans newest first, paged with an opaque ``cursor``
+    (see ScanCursorPagination).  Filters: see ``filter_scans``.
+    """
+    queryset = RFIDScan.objects.all()
     serializer_class = RFIDScanSerializer
-    permission_classes = [permissions.IsAuthenticated]
\ No newline at end of file
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ScanCursorPagination
+
+    def get_queryset(self):
+        return filter_scans(super().get_queryset(), self.request.query_params)
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """
+    ``?format=`` selects the export format, not a DRF renderer.
+    """
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class RFIDScanExportView(APIView):
+    """
+    Stream scan history as ``?format=csv`` (default) or ``ndjson``, oldest
+    first, optionally ``?gzip=1``.  Accepts the ``filter_scans`` filters,
+    which run in SQL; rows are read through a server-side cursor.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request):
+        fmt = request.query_params.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return Response({'error': 'format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('gzip') in ('1', 'true')
+
+        chunks = export_rows(filter_scans(RFIDScan.objects.all(), request.query_params), fmt)
+        filename = f"rfid-scans.{fmt}"
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        if compress:
+            chunks = gzip_stream(chunks)
+            filename += '.gz'
+            content_type = 'application/gzip'
+        if isinstance(request._request, ASGIRequest):
+            # Django buffers sync iterators under ASGI; step through it instead
+            chunks = iterate_async(chunks)
+
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class RFIDScanHourlyView(APIView):
+    """
+    Scan and read counts from the hourly rollup, for charts and reports.
+
+    ``?group_by=`` takes any of ``hour``, ``tag`` and ``reader``
+    (comma separated, default ``hour``); ``tag``/``reader`` filter and
+    ``since``/``until`` bound the hours (default: the last 24 hours).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    group_fields = {'hour': 'hour', 'tag': 'rfid_tag', 'reader': 'reader_id'}
+
+    def get(self, request):
+        params = request.query_params
+        group_by = [name.strip() for name in params.get('group_by', 'hour').split(',') if name.strip()]
+        unknown = [name for name in group_by if name not in self.group_fields]
+        if unknown or not group_by:
+            return Response(
+                {'error': f"group_by takes {', '.join(self.group_fields)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        until = query_datetime(params, 'until') or timezone.now()
+        since = query_datetime(params, 'since') or until - timedelta(hours=24)
+        buckets = RFIDScanHourly.objects.filter(hour__gte=since, hour__lt=until)
+        if params.get('tag'):
+            buckets = buckets.filter(rfid_tag=params['tag'])
+        if params.get('reader'):
+            buckets = buckets.filter(reader_id=params['reader'])
+
+        fields = [self.group_fields[name] for name in group_by]
+        rows = (
+            buckets.values(*fields)
+            .annotate(scans=Sum('scan_count'), hits=Sum('hit_count'))
+            .order_by(*fields)
+        )
+        return Response({'since': since, 'until': until, 'results': list(rows)})
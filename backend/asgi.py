@@ -5,6 +5,30 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+ASGI deployment mode
+--------------------
+Run the project under uvicorn to serve the native async MQTT webhook
+(``/api/mqtt-webhook/async/``).  Each webhook call is parked on the event
+loop while its scan waits in the async batcher (``api.ingest``), so one
+process can hold thousands of concurrent EMQX requests and commits them in
+a few bulk inserts instead of tying up one thread per request::
+
+    uvicorn backend.asgi:application --host 0.0.0.0 --port 8000 \
+        --workers 4 --limit-concurrency 20000 --backlog 4096
+
+Point the EMQX HTTP action at ``/api/mqtt-webhook/async/`` with the same
+``X-Webhook-Token`` header as the sync endpoint.  Batch size and flush
+delay are set with ``MQTT_ASYNC_BATCH_SIZE`` and
+``MQTT_ASYNC_FLUSH_INTERVAL``.  Any sync-only middleware in ``MIDDLEWARE``
+adds a thread hop per request, so keep that list async-capable for this
+mode.  The sync API keeps working unchanged under the same server.
+
+The live scan stream (``/api/rfid-scans/stream/``) is Server-Sent Events
+and also needs this mode: every open stream is a parked coroutine, and
+each process polls for new scans once per
+``RFID_SCAN_STREAM_POLL_INTERVAL`` however many clients are connected.
+Under WSGI each stream would hold a worker for as long as it is open.
 """
 
 import os
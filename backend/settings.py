@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import dj_database_url
+import json
 import os
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,6 +34,11 @@ ALLOWED_HOSTS = ['.vercel.app', 'localhost', '127.0.0.1']
 
 # MQTT Webhook secret
 MQTT_WEBHOOK_SECRET = os.environ.get('MQTT_WEBHOOK_SECRET', 'your-strong-secret-here')
+# Maximum number of messages accepted by one bulk webhook request
+MQTT_WEBHOOK_MAX_BATCH = int(os.environ.get('MQTT_WEBHOOK_MAX_BATCH', 5000))
+# Async webhook batching (ASGI deployments, see backend/asgi.py)
+MQTT_ASYNC_BATCH_SIZE = int(os.environ.get('MQTT_ASYNC_BATCH_SIZE', 500))
+MQTT_ASYNC_FLUSH_INTERVAL = float(os.environ.get('MQTT_ASYNC_FLUSH_INTERVAL', 0.05))  # seconds
 
 # Application definition
 
@@ -98,6 +104,29 @@ DATABASES = {
     'default': dj_database_url.config(conn_max_age=600, ssl_require=True)
 }
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Per-process memory by default; set REDIS_URL (needs the redis package)
+# to share the cache between workers.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))  # seconds
+ORG_TREE_CACHE_TTL = int(os.environ.get('ORG_TREE_CACHE_TTL', 300))  # seconds
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -119,7 +148,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -128,6 +157,11 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
 
+# Users resolved by api.authentication.CachedJWTAuthentication are kept
+# in-process for this long (0 disables the cache)
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60))  # seconds
+AUTH_USER_CACHE_SIZE = int(os.environ.get('AUTH_USER_CACHE_SIZE', 10000))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
@@ -159,4 +193,76 @@ MQTT_BROKER = "u81317a2.ala.eu-central-1.emqxsl.com"
 MQTT_PORT = 8883
 MQTT_USERNAME = "django_subscriber"   # The user you created in EMQX
 MQTT_PASSWORD = "djangosubscriber"  
-MQTT_TOPIC = "/transaction"
\ No newline at end of file
+MQTT_TOPIC = "/transaction"
+
+# Buffered ingestion (mqtt_subscriber)
+MQTT_BATCH_SIZE = int(os.environ.get('MQTT_BATCH_SIZE', 500))
+MQTT_FLUSH_INTERVAL = float(os.environ.get('MQTT_FLUSH_INTERVAL', 1.0))  # seconds
+MQTT_QUEUE_SIZE = int(os.environ.get('MQTT_QUEUE_SIZE', 10000))
+MQTT_STATS_INTERVAL = float(os.environ.get('MQTT_STATS_INTERVAL', 10.0))  # seconds
+MQTT_WORKERS = int(os.environ.get('MQTT_WORKERS', 1))
+MQTT_SHARE_GROUP = os.environ.get('MQTT_SHARE_GROUP', 'django_subscribers')  # $share/<group>/<topic>
+
+# RFID tag -> pk cache used by scan ingestion
+RFID_TAG_CACHE_SIZE = int(os.environ.get('RFID_TAG_CACHE_SIZE', 100000))
+RFID_TAG_CACHE_TTL = int(os.environ.get('RFID_TAG_CACHE_TTL', 300))  # seconds
+RFID_TAG_CACHE_NEGATIVE_TTL = int(os.environ.get('RFID_TAG_CACHE_NEGATIVE_TTL', 30))  # seconds
+
+# Read-burst deduplication: repeats of a (tag, reader) within this many
+# seconds of its first read are merged into one RFIDScan row. 0 disables merging.
+RFID_SCAN_DEDUP_WINDOW = float(os.environ.get('RFID_SCAN_DEDUP_WINDOW', 2.0))  # seconds
+RFID_SCAN_DEDUP_MAX_KEYS = int(os.environ.get('RFID_SCAN_DEDUP_MAX_KEYS', 100000))
+
+# Local spool for scans the subscriber could not write (database down)
+MQTT_SPOOL_PATH = os.environ.get('MQTT_SPOOL_PATH', str(BASE_DIR / 'spool' / 'mqtt_scans.spool'))
+MQTT_SPOOL_RETRY_INTERVAL = float(os.environ.get('MQTT_SPOOL_RETRY_INTERVAL', 5.0))  # seconds
+
+# Raw EMQX envelope retention on RFIDScan.payload:
+# 'errors' (malformed messages only), 'sample', 'all' or 'none'
+RFID_SCAN_PAYLOAD_MODE = os.environ.get('RFID_SCAN_PAYLOAD_MODE', 'errors')
+RFID_SCAN_PAYLOAD_SAMPLE_RATE = float(os.environ.get('RFID_SCAN_PAYLOAD_SAMPLE_RATE', 0.01))
+
+# RFIDScan partitioning and retention (manage_scan_partitions).
+# PostgreSQL uses native range partitions; other databases a plain table.
+RFID_SCAN_PARTITION_INTERVAL = os.environ.get('RFID_SCAN_PARTITION_INTERVAL', 'month')  # 'day' or 'month'
+RFID_SCAN_PARTITIONS_AHEAD = int(os.environ.get('RFID_SCAN_PARTITIONS_AHEAD', 3))
+RFID_SCAN_RETENTION_DAYS = int(os.environ.get('RFID_SCAN_RETENTION_DAYS', 0))  # 0 keeps everything
+
+# Keyset pagination of /api/rfid-scans/ (?page_size= is capped at the max)
+RFID_SCAN_PAGE_SIZE = int(os.environ.get('RFID_SCAN_PAGE_SIZE', 100))
+RFID_SCAN_MAX_PAGE_SIZE = int(os.environ.get('RFID_SCAN_MAX_PAGE_SIZE', 1000))
+
+# Page-number pagination (api.pagination.StandardPagination)
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Hourly scan rollup (rollup_scans): scans are folded once this many seconds
+# have passed since a run saw their id, so late commits and dedup merges are
+# included. Never less than the dedup window plus the writer flush interval.
+RFID_SCAN_ROLLUP_LAG = int(os.environ.get('RFID_SCAN_ROLLUP_LAG', 60))
+
+# Live scan stream (/api/rfid-scans/stream/, ASGI only)
+RFID_SCAN_STREAM_POLL_INTERVAL = float(os.environ.get('RFID_SCAN_STREAM_POLL_INTERVAL', 0.5))  # seconds
+RFID_SCAN_STREAM_BATCH_SIZE = int(os.environ.get('RFID_SCAN_STREAM_BATCH_SIZE', 500))
+RFID_SCAN_STREAM_QUEUE_SIZE = int(os.environ.get('RFID_SCAN_STREAM_QUEUE_SIZE', 1000))  # events per client
+RFID_SCAN_STREAM_BACKLOG = int(os.environ.get('RFID_SCAN_STREAM_BACKLOG', 1000))  # max events replayed on resume
+RFID_SCAN_STREAM_HEARTBEAT = int(os.environ.get('RFID_SCAN_STREAM_HEARTBEAT', 15))  # seconds
+# Reader (EMQX clientid) -> shop id, e.g. '{"reader-01": 3}'; used by ?shop=
+RFID_READER_SHOPS = json.loads(os.environ.get('RFID_READER_SHOPS', '{}'))
+
+# Stock-take reconciliation (/api/reconciliation/)
+RECONCILE_MAX_TAGS = int(os.environ.get('RECONCILE_MAX_TAGS', 50000))
+
+# Catalogue bulk import (/api/catalogue/import/<kind>/, import_catalogue)
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 2000))
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))  # reported per import
+
+# Bulk tagging (/api/rfid-jewellery-map/bulk/)
+BULK_MAP_MAX_ITEMS = int(os.environ.get('BULK_MAP_MAX_ITEMS', 5000))
+
+# Scan export (/api/rfid-scans/export/, export_scans): rows per cursor fetch
+RFID_SCAN_EXPORT_CHUNK_SIZE = int(os.environ.get('RFID_SCAN_EXPORT_CHUNK_SIZE', 2000))
+
+# Compiled role permission masks (api.permissions) are cached per user in
+# the default cache above, so role changes reach every worker
+ROLE_PERMISSION_CACHE_TTL = int(os.environ.get('ROLE_PERMISSION_CACHE_TTL', 300))  # seconds